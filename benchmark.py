@@ -0,0 +1,228 @@
+import argparse
+import gc
+import importlib.util
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from data_loader.compressed_trie import CompressedTrie
+from data_loader.trie import Trie
+
+# DB 없이 돌아가는 trie 벤치마크
+# 생성한 한국어 단어 corpus로 구현체마다 구축 시간 / 최대 메모리 / prefix, 오타 검색 latency 분포를 측정
+# 결과는 JSON lines (구현체마다 한 줄) -> 커밋 간 비교는 --compare 로
+#   python benchmark.py --words 200000 --out bench.json
+#   python benchmark.py --words 200000 --compare bench.json
+
+ETC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "test", "etc")
+LIMIT = 15
+
+# 사전 데이터처럼 앞 글자일수록 자주 쓰이는 음절이 몰리도록 만든 음절 목록
+_COMMON = "가나다라마바사아자차카타파하고도로모보소오조초코토포호구누두루무부수우주추쿠투푸후기니디리미비시이지치키티피히" \
+          "개내대래매배새애재채한국어사전단어자동완성검색정보문학생활시간공부하다되다스럽다적인성화"
+
+
+def generate_corpus(n: int, seed: int = 0):
+    # (id, word) 목록, 동음이의어와 서로 prefix 관계인 단어도 섞음
+    rng = random.Random(seed)
+    rare = [chr(0xAC00 + rng.randrange(11172)) for _ in range(2000)]
+    words = []
+    for db_id in range(1, n + 1):
+        if words and rng.random() < 0.1:
+            base = words[rng.randrange(len(words))][1]
+            # 동음이의어 or 기존 단어 + 접미사
+            word = base if rng.random() < 0.5 else base + rng.choice(_COMMON)
+        else:
+            length = min(1 + int(rng.expovariate(0.35)), 12)
+            word = "".join(rng.choice(_COMMON) if rng.random() < 0.7 else rng.choice(rare) for _ in range(length))
+        words.append((db_id, word))
+    return words
+
+
+def _load_etc(module_name: str, file_name: str):
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(ETC_DIR, file_name))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _insert_all(cls):
+    def build(corpus):
+        trie = cls()
+        for db_id, word in corpus:
+            trie.insert(word, db_id)
+        return trie
+    return build
+
+
+def _from_sorted(corpus):
+    return CompressedTrie.from_sorted(sorted((word, db_id) for db_id, word in corpus))
+
+
+def engines():
+    # name -> (구축 함수, prefix 검색 함수, 오타 검색 함수 or None)
+    result = {
+        "trie": (_insert_all(Trie), lambda t, q: t.search_prefix(q)[:LIMIT], None),
+        "compressed_trie": (
+            _insert_all(CompressedTrie),
+            lambda t, q: t.search_prefix(q, LIMIT),
+            lambda t, q: t.search_fuzzy(q, 1, LIMIT, None)[0],
+        ),
+        "compressed_trie_sorted": (
+            _from_sorted,
+            lambda t, q: t.search_prefix(q, LIMIT),
+            lambda t, q: t.search_fuzzy(q, 1, LIMIT, None)[0],
+        ),
+        "frozen_trie": (
+            lambda corpus: _from_sorted(corpus).freeze(),
+            lambda t, q: t.search_prefix(q, LIMIT),
+            lambda t, q: t.search_fuzzy(q, 1, LIMIT, None)[0],
+        ),
+    }
+
+    # test/etc의 실험용 구현체 (data_loader.db를 import하므로 mysql-connector 패키지가 필요함)
+    try:
+        skip_trie = _load_etc("SkipTrie", "SkipTrie.py")
+        skip_compressed_trie = _load_etc("skipCompressedTrie", "skipCompressedTrie.py")
+    except ImportError as e:
+        print(f"skip test/etc engines: {e}", file=sys.stderr)
+    else:
+        result["skip_trie"] = (
+            _insert_all(skip_trie.Trie),
+            lambda t, q: t.search_prefix(q)[:LIMIT],
+            lambda t, q: t.search_skip_prefix(q, 1)[:LIMIT],
+        )
+        result["skip_compressed_trie"] = (
+            _insert_all(skip_compressed_trie.SkipCompressedTrie),
+            lambda t, q: t.search_prefix(q)[:LIMIT],
+            lambda t, q: t.search_skip_prefix(q, 1)[:LIMIT],
+        )
+    return result
+
+
+def make_queries(corpus, count: int, seed: int = 1):
+    rng = random.Random(seed)
+    prefix_queries = []
+    fuzzy_queries = []
+    for _ in range(count):
+        word = corpus[rng.randrange(len(corpus))][1]
+        query = word[:rng.randint(1, min(3, len(word)))]
+        prefix_queries.append(query)
+
+        # 한 글자를 다른 음절로 바꾼 오타
+        typo = list(word[:rng.randint(2, max(2, min(4, len(word))))])
+        typo[rng.randrange(len(typo))] = rng.choice(_COMMON)
+        fuzzy_queries.append("".join(typo))
+    return prefix_queries, fuzzy_queries
+
+
+def latency_ms(search, trie, queries):
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        search(trie, query)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    cuts = statistics.quantiles(timings, n=100)
+    return {"p50": cuts[49], "p90": cuts[89], "p99": cuts[98], "max": max(timings)}
+
+
+def run_engine(name, build, prefix_search, fuzzy_search, corpus, prefix_queries, fuzzy_queries, memory: bool):
+    result = {"engine": name, "words": len(corpus)}
+
+    gc.collect()
+    start = time.perf_counter()
+    trie = build(corpus)
+    result["build_s"] = time.perf_counter() - start
+    result["node_cnt"] = trie.node_cnt
+
+    for key, value in latency_ms(prefix_search, trie, prefix_queries).items():
+        result[f"prefix_{key}_ms"] = value
+    if fuzzy_search is not None:
+        for key, value in latency_ms(fuzzy_search, trie, fuzzy_queries).items():
+            result[f"fuzzy_{key}_ms"] = value
+    del trie
+
+    if memory:
+        # tracemalloc은 구축 속도를 크게 떨어뜨리므로 따로 한 번 더 구축해서 측정
+        gc.collect()
+        tracemalloc.start()
+        trie = build(corpus)
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result["current_mb"] = current / 1024 / 1024
+        result["peak_mb"] = peak / 1024 / 1024
+        del trie
+
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(results, baseline_path: str):
+    # 이전 결과와 비교: 값 / 이전 값 (1보다 크면 느려짐 or 메모리 증가)
+    with open(baseline_path) as f:
+        baseline = {row["engine"]: row for row in map(json.loads, f) if row.get("engine")}
+
+    for row in results:
+        old = baseline.get(row["engine"])
+        if old is None:
+            continue
+        ratios = {
+            key: round(value / old[key], 3)
+            for key, value in row.items()
+            if key.endswith(("_s", "_ms", "_mb")) and old.get(key)
+        }
+        print(json.dumps({"engine": row["engine"], "baseline": old.get("commit"), "ratio": ratios}), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--words", type=int, default=100000)
+    parser.add_argument("--skip-words", type=int, default=20000,
+                        help="skip_* 구현체는 오타 검색이 지수적으로 느려서 더 작은 corpus로 측정")
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--engines", help="쉼표로 구분 (기본: 전부)")
+    parser.add_argument("--no-memory", action="store_true")
+    parser.add_argument("--out", help="결과를 저장할 JSON lines 파일 (기본: stdout)")
+    parser.add_argument("--compare", help="비교할 이전 결과 파일")
+    args = parser.parse_args()
+
+    corpus = generate_corpus(args.words, args.seed)
+    commit = git_commit()
+
+    selected = engines()
+    if args.engines:
+        selected = {name: selected[name] for name in args.engines.split(",")}
+
+    results = []
+    for name, (build, prefix_search, fuzzy_search) in selected.items():
+        engine_corpus = corpus[:args.skip_words] if name.startswith("skip_") else corpus
+        prefix_queries, fuzzy_queries = make_queries(engine_corpus, args.queries, args.seed + 1)
+        result = run_engine(name, build, prefix_search, fuzzy_search, engine_corpus,
+                            prefix_queries, fuzzy_queries, not args.no_memory)
+        result["commit"] = commit
+        results.append(result)
+        print(f"{name}: done", file=sys.stderr)
+
+    lines = "".join(json.dumps(row) + "\n" for row in results)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(lines)
+    else:
+        sys.stdout.write(lines)
+
+    if args.compare:
+        compare(results, args.compare)
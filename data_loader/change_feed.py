@@ -0,0 +1,88 @@
+import asyncio
+import traceback
+
+from .compressed_trie import CompressedTrie
+from .dataset import check_row, report_quarantine
+from .db import fetch_new_words, fetch_word_changes, invalidate_rows
+
+
+class ChangeFeed:
+    # words 테이블의 변경분만 주기적으로 가져와서 trie에 반영 (전체 재구축 없이)
+    #   추가      : words.id > last_id
+    #   수정/삭제 : word_changes.seq > last_seq (db.create_change_log의 trigger가 기록)
+    def __init__(self, trie: CompressedTrie, last_id: int, last_seq: int, interval: float, batch_size: int = 1000,
+                 executor=None):
+        self.trie = trie
+        self.last_id = last_id
+        self.last_seq = last_seq
+        self.interval = interval
+        self.batch_size = batch_size
+        self.on_change = []  # 변경이 반영될 때마다 호출할 함수들 (캐시 무효화 등, coroutine 함수면 await)
+        # 검색이 SearchExecutor의 thread에서 돌고 있으면 trie 변경은 검색이 없을 때만 (executor.exclusive)
+        self.executor = executor
+
+    async def run(self):
+        while True:
+            try:
+                applied = await self.poll_once()
+            except Exception:
+                # DB가 잠깐 끊겨도 feed는 계속 돌아야 함
+                traceback.print_exc()
+                applied = 0
+
+            if applied:
+                print(f"change feed: {applied} changes applied")
+                for callback in self.on_change:
+                    result = callback()
+                    if asyncio.iscoroutine(result):
+                        await result
+            # 한 번에 다 못 가져왔으면 바로 이어서 가져옴
+            if applied < self.batch_size:
+                await asyncio.sleep(self.interval)
+
+    async def poll_once(self) -> int:
+        new_words = await fetch_new_words(self.last_id, self.batch_size)
+        changes = await fetch_word_changes(self.last_seq, self.batch_size)
+        if not new_words and not changes:
+            return 0
+
+        if self.executor is None:
+            applied = self._apply(new_words, changes)
+        else:
+            applied = await self.executor.exclusive(self._apply, new_words, changes)
+        # row 캐시는 event loop에서만 건드림
+        invalidate_rows([db_id for _, db_id, _, _ in changes])
+        return applied
+
+    def _apply(self, new_words: list, changes: list) -> int:
+        # 구축할 때와 같은 검사를 거침 (정규화하면 빈 단어가 root에 들어가는 일이 없도록)
+        # 문제가 있는 row는 trie에 넣지 않고 보고만 함 (위치는 그대로 넘어감)
+        applied = 0
+        quarantined = []
+
+        for db_id, word in new_words:
+            cur_word, problem = check_row(db_id, word)
+            if problem is None:
+                self.trie.insert(cur_word, db_id)
+            else:
+                quarantined.append(problem)
+            self.last_id = db_id
+            applied += 1
+
+        for seq, db_id, old_word, new_word in changes:
+            # 예전 단어가 격리됐던 row였다면 trie에 없으므로 지울 것도 없음
+            cur_old, _ = check_row(db_id, old_word)
+            if cur_old is not None:
+                self.trie.delete(cur_old, db_id)
+            if new_word is not None:
+                cur_new, problem = check_row(db_id, new_word)
+                if problem is None:
+                    self.trie.insert(cur_new, db_id)
+                else:
+                    quarantined.append(problem)
+            self.last_seq = seq
+            applied += 1
+
+        if quarantined:
+            report_quarantine(quarantined)
+        return applied
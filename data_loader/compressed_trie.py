@@ -1,84 +1,300 @@
-from typing import List, Tuple, Set
-from .db import fetchall
+import heapq
+from array import array
+from bisect import bisect_left
+from itertools import chain, islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
 
 class CompressedTrieNode:
-    def __init__(self):
-        self.children = {}  # 문자열(edge) -> CompressedTrieNode
+    __slots__ = ("edge", "children", "is_end_of_word", "ids", "top_k")
+
+    def __init__(self, edge: str = ""):
+        # 형제 edge끼리는 첫 글자가 겹치지 않으므로 첫 글자를 key로 사용
+        # -> child 찾기는 dict lookup 한 번 + edge 비교 한 번
+        self.edge = edge  # 부모에서 이 node로 들어오는 문자열
+        self.children = {}  # edge의 첫 글자 -> CompressedTrieNode
         self.is_end_of_word = False
-        self.ids = set()  # 해당 단어에 매핑된 DB ID들 (복수 가능)
+        # 해당 단어에 매핑된 DB ID들 (복수 가능), 정렬된 array('q')
+        # set + int 객체 대신 8byte 정수 배열로 저장하고, 단어 끝이 아닌 node는 None (할당하지 않음)
+        self.ids = None
+        self.top_k = None  # build_top_k 후: subtree에서 점수가 가장 좋은 (score, word, ids) 목록
 
 
-class CompressedTrie:
-    def __init__(self):
-        self.root = CompressedTrieNode()
-        self.node_cnt = 1  # root 포함
+# 점수가 작을수록 상위에 노출됨
+Scorer = Callable[[str, Sequence[int]], float]
 
-    def insert(self, word: str, db_id: str):
-        node = self.root
-        while word:
-            for edge, child in node.children.items():
-                common_len = self._common_prefix_len(word, edge)
-                if common_len == 0:
-                    continue
+SCORERS: Dict[str, Scorer] = {
+    "length": lambda word, ids: len(word),  # 짧은 단어 우선
+    "senses": lambda word, ids: -len(ids),  # 뜻(동음이의어)이 많은 단어 우선
+}
 
-                if common_len < len(edge):
-                    # 기존 edge 분할
-                    new_child = CompressedTrieNode()
-                    new_child.children[edge[common_len:]] = child
-                    new_child.is_end_of_word = False
 
-                    node.children[edge[:common_len]] = new_child
-                    del node.children[edge]
-                    node = new_child
+def frequency_scorer(freq: Dict[str, float]) -> Scorer:
+    # 외부 빈도 데이터(단어 -> 빈도)로 순위를 매김, 빈도가 높을수록 우선
+    return lambda word, ids: -freq.get(word, 0)
 
-                    if common_len == len(word):
-                        node.is_end_of_word = True
-                        node.ids.add(db_id)
-                        return
 
-                    word = word[common_len:]
-                    break
+def _add_id(node: CompressedTrieNode, db_id: int):
+    ids = node.ids
+    if ids is None:
+        node.ids = array('q', (db_id,))
+        return
+    i = bisect_left(ids, db_id)
+    if i == len(ids) or ids[i] != db_id:
+        ids.insert(i, db_id)
 
-                if common_len == len(edge):
-                    word = word[common_len:]
-                    node = child
-                    break
-            else:
+
+def _remove_id(node: CompressedTrieNode, db_id: int) -> bool:
+    ids = node.ids
+    if ids is None:
+        return False
+    i = bisect_left(ids, db_id)
+    if i == len(ids) or ids[i] != db_id:
+        return False
+    del ids[i]
+    if not ids:
+        node.ids = None
+    return True
+
+
+class CompressedTrie:
+    def __init__(self):
+        self.root = CompressedTrieNode()
+        self.node_cnt = 1  # root 포함
+        self.top_k_size = 0  # 0이면 top_k 캐시를 사용하지 않음
+        self._scorer = None
+        self.version = 0  # insert / delete 할 때마다 증가 (밖에서 들고 있는 node 참조가 유효한지 확인용)
+        self.nodes_visited = 0  # 탐색하면서 거친 node 수 누적 (/metrics 용)
+
+    @classmethod
+    def from_sorted(cls, items: Iterable[Tuple[str, int]]) -> "CompressedTrie":
+        # 단어 기준으로 정렬된 (word, db_id)들로 한 번에 구축
+        # 정렬되어 있으면 새 단어는 항상 가장 오른쪽 경로에만 붙으므로,
+        # 열려있는 경로를 stack으로 들고 있으면 child를 훑거나 기존 edge를 찾아 분할할 필요가 없음
+        trie = cls()
+        stack = [(trie.root, 0)]  # (node, root부터의 글자 수)
+        prev = None
+
+        for word, db_id in items:
+            if prev is not None and word < prev:
+                raise ValueError(f"from_sorted: 정렬되지 않은 입력 ({prev!r} 다음에 {word!r})")
+
+            if word == prev:
+                # 동음이의어: 방금 만든 단어 끝 node에 id만 추가
+                _add_id(stack[-1][0], db_id)
+                continue
+
+            common_len = trie._common_prefix_len(prev, word) if prev else 0
+
+            popped = None
+            while stack[-1][1] > common_len:
+                popped = stack.pop()
+
+            parent, depth = stack[-1]
+            if depth < common_len:
+                # 방금 닫힌 가장 오른쪽 edge의 중간에서 갈라짐 -> 그 edge 하나만 잘라서 이어붙임
+                child = popped[0]
+                cut = common_len - depth
+                new_child = trie._split(parent, child, cut)
+                stack.append((new_child, common_len))
+                parent = new_child
+
+            node = trie.root
+            if word:
+                node = CompressedTrieNode(word[common_len:])
+                parent.children[word[common_len]] = node
+                trie.node_cnt += 1
+                stack.append((node, len(word)))
+            node.is_end_of_word = True
+            _add_id(node, db_id)
+            prev = word
+
+        return trie
+
+    def insert(self, word: str, db_id: int):
+        self.version += 1
+        node = self.root
+        path = [node]  # top_k 갱신용: root부터 단어 끝 node까지
+        rest = word
+        while rest:
+            child = node.children.get(rest[0])
+            if child is None:
                 # 일치하는 edge가 없음
-                node.children[word] = CompressedTrieNode()
-                node.children[word].is_end_of_word = True
-                node.children[word].ids.add(db_id)
+                child = CompressedTrieNode(rest)
+                node.children[rest[0]] = child
                 self.node_cnt += 1
-                return
+                rest = ""
+            else:
+                common_len = self._common_prefix_len(rest, child.edge)
+                if common_len < len(child.edge):
+                    # 기존 edge 분할
+                    child = self._split(node, child, common_len)
+                rest = rest[common_len:]
+
+            node = child
+            path.append(node)
 
         node.is_end_of_word = True
-        node.ids.add(db_id)
+        _add_id(node, db_id)
 
-    def search_prefix(self, prefix: str):
+        if self.top_k_size:
+            self._refresh_top_k(path, word)
+
+    def delete(self, word: str, db_id: int) -> bool:
+        # word에서 db_id를 제거, 더 이상 id가 없으면 node를 정리하고 edge를 다시 합침
+        self.version += 1
+        node = self.root
+        path = [node]
+        rest = word
+        while rest:
+            child = node.children.get(rest[0])
+            if child is None or not rest.startswith(child.edge):
+                return False
+            rest = rest[len(child.edge):]
+            node = child
+            path.append(node)
+
+        if not _remove_id(node, db_id):
+            return False
+
+        if node.ids is None:
+            node.is_end_of_word = False
+            if node is not self.root and not node.children:
+                # 자식이 없는 node는 통째로 제거 -> 부모가 합칠 대상이 될 수 있음
+                path.pop()
+                del path[-1].children[node.edge[0]]
+                self.node_cnt -= 1
+                node = path[-1]
+
+            if node is not self.root and not node.is_end_of_word and len(node.children) == 1:
+                path.pop()
+                self._merge(path[-1], node)
+
+        if self.top_k_size:
+            self._refresh_top_k(path, word)
+        return True
+
+    def _split(self, parent: CompressedTrieNode, child: CompressedTrieNode, cut: int) -> CompressedTrieNode:
+        # parent -> child edge를 cut 위치에서 잘라 중간 node를 끼워넣음 (같은 첫 글자 key를 그대로 재사용)
+        new_child = CompressedTrieNode(child.edge[:cut])
+        child.edge = child.edge[cut:]
+        new_child.children[child.edge[0]] = child
+        parent.children[new_child.edge[0]] = new_child
+        self.node_cnt += 1
+        return new_child
+
+    def _merge(self, parent: CompressedTrieNode, node: CompressedTrieNode):
+        # 단어 끝도 아니고 자식이 하나뿐인 node는 자식과 합쳐 edge 하나로 만듦 (_split의 반대)
+        child = next(iter(node.children.values()))
+        child.edge = node.edge + child.edge
+        parent.children[child.edge[0]] = child
+        self.node_cnt -= 1
+
+    def search_prefix(self, prefix: str, limit: Optional[int] = None) -> List[Tuple[str, Sequence[int]]]:
+        found = self._find_node(prefix)
+        if found is None:
+            return []
+        return self._search_node(*found, limit)
+
+    def _search_node(self, node: CompressedTrieNode, path: str, limit: Optional[int]) -> List[Tuple[str, Sequence[int]]]:
+        if limit is not None and limit <= self.top_k_size:
+            # 미리 계산된 순위 목록이 있으면 descent 한 번으로 끝
+            return [(word, ids) for _, word, ids in node.top_k[:limit]]
+
+        # limit이 주어지면 limit개를 모으는 즉시 탐색을 멈춤 (subtree 전체를 만들지 않음)
+        return list(islice(self._iter_all_words(node, path), limit))
+
+    def cursor(self):
+        # 한 글자씩 늘어나는 입력을 이어서 탐색하는 cursor
+        from .cursor import PrefixCursor
+        return PrefixCursor(self)
+
+    def build_top_k(self, k: int, score: Union[str, Scorer] = "length"):
+        # 모든 node에 subtree 기준 상위 k개의 (score, word, ids)를 저장
+        # 자식들의 top_k만 합치면 되므로 아래에서부터(post-order) 계산
+        self._scorer = SCORERS[score] if isinstance(score, str) else score
+        self.top_k_size = k
+
+        order = []
+        stack = [(self.root, "")]
+        while stack:
+            node, path = stack.pop()
+            order.append((node, path))
+            for child in node.children.values():
+                stack.append((child, path + child.edge))
+
+        for node, path in reversed(order):
+            self._compute_top_k(node, path)
+
+    def _compute_top_k(self, node: CompressedTrieNode, path: str):
+        candidates = chain.from_iterable(child.top_k for child in node.children.values())
+        if node.is_end_of_word:
+            candidates = chain([(self._scorer(path, node.ids), path, node.ids)], candidates)
+        # word는 subtree 안에서 유일하므로 ids까지 비교할 일은 없음
+        node.top_k = heapq.nsmallest(self.top_k_size, candidates, key=lambda item: item[:2])
+
+    def _refresh_top_k(self, path: List[CompressedTrieNode], word: str):
+        # insert / delete 후 바뀐 경로의 node들만 아래에서부터 다시 계산
+        depths = []
+        depth = 0
+        for node in path:
+            depth += len(node.edge)
+            depths.append(depth)
+
+        for node, depth in zip(reversed(path), reversed(depths)):
+            self._compute_top_k(node, word[:depth])
+
+    def get(self, word: str) -> Optional[Sequence[int]]:
+        # 정확히 일치하는 단어의 DB ID들 (없으면 None)
+        found = self._find_node(word)
+        if found is None or found[1] != word or not found[0].is_end_of_word:
+            return None
+        return found[0].ids
+
+    def iter_prefix(self, prefix: str, after: Optional[str] = None) -> Iterator[Tuple[str, Sequence[int]]]:
+        # search_prefix의 lazy 버전, 필요한 만큼만 꺼내 쓰면 됨
+        # after가 주어지면 그 단어 바로 다음부터 이어서 순회 (페이지 단위 조회용)
+        found = self._find_node(prefix)
+        if found is None:
+            return iter(())
+
+        node, path = found
+        if after is None:
+            return self._iter_all_words(node, path)
+        return self._iter_after(node, path, after)
+
+    def _find_node(self, prefix: str) -> Optional[Tuple[CompressedTrieNode, str]]:
+        # prefix가 끝나는 node와, root부터 그 node까지의 경로(문자열)를 반환
         node = self.root
         path = ""
 
         while prefix:
-            for edge, child in node.children.items():
-                common_len = self._common_prefix_len(prefix, edge)
-
-                if common_len == 0:
-                    continue
-
-                if edge.startswith(prefix):
-                    # 예: edge = "가는 말이 고와야", prefix = "가는 말이"
-                    path += prefix
-                    return self._collect_all_words(child, path + edge[len(prefix):])
-
-                if prefix.startswith(edge):
-                    prefix = prefix[len(edge):]
-                    path += edge
-                    node = child
-                    break
-            else:
-                return []
-
-        return self._collect_all_words(node, path)
+            self.nodes_visited += 1
+            child = node.children.get(prefix[0])
+            if child is None:
+                return None
+
+            edge = child.edge
+            if edge.startswith(prefix):
+                # 예: edge = "가는 말이 고와야", prefix = "가는 말이"
+                return child, path + edge
+            if not prefix.startswith(edge):
+                return None
+
+            prefix = prefix[len(edge):]
+            path += edge
+            node = child
+
+        return node, path
+
+    def search_fuzzy(self, query: str, max_dist: int = 1, limit: Optional[int] = 15,
+                     time_budget: Optional[float] = 0.1) -> Tuple[List[Tuple[str, Sequence[int]]], bool]:
+        from .fuzzy import search_fuzzy
+        return search_fuzzy(self, query, max_dist, limit, time_budget)
+
+    def freeze(self):
+        # 읽기 전용 flat 배열 형태로 변환 (search_prefix / iter_prefix는 그대로 사용 가능)
+        from .frozen_trie import FrozenTrie
+        return FrozenTrie.from_trie(self)
 
     def print_trie(self, node=None, prefix="", depth=0):
         if node is None:
@@ -86,30 +302,84 @@ class CompressedTrie:
             print("[Trie 구조]")
 
         indent = "    " * depth
-        for edge, child in node.children.items():
-            node_info = f"{indent}└─ {edge}"
+        for child in node.children.values():
+            node_info = f"{indent}└─ {child.edge}"
             if child.is_end_of_word:
                 node_info += f" (EOW, ids={list(child.ids)})"
             print(node_info)
-            self.print_trie(child, prefix + edge, depth + 1)
+            self.print_trie(child, prefix + child.edge, depth + 1)
 
-    def _collect_all_words(self, node: CompressedTrieNode, prefix: str) -> List[Tuple[str, Set[str]]]:
-        results = []
-        if node.is_end_of_word:
-            results.append((prefix, node.ids))
+    def _child(self, node: CompressedTrieNode, char: str) -> Optional[CompressedTrieNode]:
+        return node.children.get(char)
+
+    def _edge(self, node: CompressedTrieNode) -> str:
+        return node.edge
+
+    def _children(self, node: CompressedTrieNode) -> Iterator[Tuple[str, CompressedTrieNode]]:
+        for child in node.children.values():
+            yield child.edge, child
 
-        for edge, child in node.children.items():
-            results.extend(self._collect_all_words(child, prefix + edge))
-        return results
+    def _collect_all_words(self, node: CompressedTrieNode, prefix: str) -> List[Tuple[str, Sequence[int]]]:
+        return list(self._iter_all_words(node, prefix))
+
+    def _iter_all_words(self, node: CompressedTrieNode, prefix: str) -> Iterator[Tuple[str, Sequence[int]]]:
+        # 재귀 대신 (경로, children iterator) stack으로 DFS
+        # -> 꺼내는 만큼만 내려가므로 중간에 멈추면 나머지 subtree는 건드리지 않음
+        if node.is_end_of_word:
+            yield prefix, node.ids
+
+        yield from self._walk([(prefix, iter(node.children.values()))])
+
+    def _iter_after(self, node: CompressedTrieNode, prefix: str, after: str) -> Iterator[Tuple[str, Sequence[int]]]:
+        # after까지 내려가면서 각 단계의 children iterator를 after의 경로 바로 다음 위치로 맞춰둠
+        # -> _iter_all_words가 after를 막 반환한 직후와 같은 stack이 됨
+        stack = [(prefix, iter(node.children.values()))]
+        rest = after[len(prefix):] if after.startswith(prefix) else ""
+        while rest:
+            child = node.children.get(rest[0])
+            if child is None or not rest.startswith(child.edge):
+                # 그 사이 단어가 삭제됨 -> 이 단계는 처음부터 다시 순회 (중복이 생길 수 있음)
+                break
+
+            path, children = stack[-1]
+            for sibling in children:
+                if sibling is child:
+                    break
+            stack.append((path + child.edge, iter(child.children.values())))
+            rest = rest[len(child.edge):]
+            node = child
+
+        return self._walk(stack)
+
+    def _walk(self, stack: list) -> Iterator[Tuple[str, Sequence[int]]]:
+        # 방문 수는 지역 변수로 세고 순회가 끝나거나 중간에 버려질 때 한 번만 더함
+        visited = 0
+        try:
+            while stack:
+                path, children = stack[-1]
+                for child in children:
+                    visited += 1
+                    word = path + child.edge
+                    if child.is_end_of_word:
+                        yield word, child.ids
+                    if child.children:
+                        stack.append((word, iter(child.children.values())))
+                    break
+                else:
+                    stack.pop()
+        finally:
+            self.nodes_visited += visited
 
     def _common_prefix_len(self, a: str, b: str) -> int:
+        n = min(len(a), len(b))
         i = 0
-        while i < min(len(a), len(b)) and a[i] == b[i]:
+        while i < n and a[i] == b[i]:
             i += 1
         return i
 
 
 def a(trie):
+    from data_loader.db import fetchall
     datas = fetchall()
 
     random.shuffle(datas)
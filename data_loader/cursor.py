@@ -0,0 +1,77 @@
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+
+class PrefixCursor:
+    # 입력이 한 글자씩 늘어나거나 줄어드는 자동완성용 검색 위치
+    # 글자마다 (edge가 끝나는 node, 그 edge에서 소비한 글자 수)를 stack에 쌓아둠
+    #   advance : 늘어난 글자만큼만 내려감 (root부터 다시 내려가지 않음)
+    #   rewind  : 지운 글자만큼 stack에서 꺼냄 (backspace)
+    #   seek    : 이전 입력과 공통된 부분은 그대로 두고 나머지만 rewind / advance
+    def __init__(self, trie):
+        self.trie = trie
+        self.query = ""
+        self._version = trie.version
+        self._positions = [(trie.root, 0)]
+
+    def seek(self, query: str):
+        if self._version != self.trie.version:
+            # trie 구조가 바뀌었으면 들고 있는 node가 더 이상 유효하지 않을 수 있음
+            self._version = self.trie.version
+            self.query = ""
+            self._positions = [(self.trie.root, 0)]
+
+        common_len = 0
+        for a, b in zip(self.query, query):
+            if a != b:
+                break
+            common_len += 1
+
+        self.rewind(len(self.query) - common_len)
+        self.advance(query[common_len:])
+
+    def advance(self, chars: str):
+        for char in chars:
+            self.query += char
+            if len(self._positions) < len(self.query):
+                # 이미 일치하는 단어가 없는 상태 -> 글자만 기록
+                continue
+
+            node, offset = self._positions[-1]
+            edge = self.trie._edge(node)
+            if offset < len(edge):
+                if edge[offset] == char:
+                    self._positions.append((node, offset + 1))
+                continue
+
+            self.trie.nodes_visited += 1
+            child = self.trie._child(node, char)
+            if child is not None:
+                self._positions.append((child, 1))
+
+    def rewind(self, count: int):
+        if count <= 0:
+            return
+        self.query = self.query[:-count]
+        del self._positions[len(self.query) + 1:]
+
+    def results(self, limit: Optional[int] = None) -> List[Tuple[str, Sequence[int]]]:
+        if len(self._positions) <= len(self.query):
+            return []
+
+        node, offset = self._positions[-1]
+        # edge 중간에서 끝났으면 나머지 edge까지 붙여서 그 node부터 수집
+        path = self.query + self.trie._edge(node)[offset:]
+        return self.trie._search_node(node, path, limit)
+
+
+def iter_short_prefixes(trie, max_len: int) -> Iterator[str]:
+    # trie에 존재하는 길이 max_len 이하의 모든 prefix (응답 캐시 미리 채우기용)
+    stack = [(trie.root, "")]
+    while stack:
+        node, path = stack.pop()
+        for edge, child in trie._children(node):
+            word = path + edge
+            for end in range(len(path) + 1, min(len(word), max_len) + 1):
+                yield word[:end]
+            if len(word) < max_len:
+                stack.append((child, word))
@@ -0,0 +1,105 @@
+import json
+import os
+import time
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from tqdm import tqdm
+
+from .db import iter_word_batches
+from .compressed_trie import CompressedTrie
+
+# 정규화 규칙: (찾을 문자열, 바꿀 문자열)을 순서대로 적용
+# NORMALIZE_RULES='[["-", ""], ["^", " "]]' 처럼 JSON으로 바꿀 수 있음
+DEFAULT_RULES = (("-", ""), ("^", " "))
+NORMALIZE_RULES = tuple(map(tuple, json.loads(os.environ["NORMALIZE_RULES"]))) \
+    if os.environ.get("NORMALIZE_RULES") else DEFAULT_RULES
+
+Rules = Sequence[Tuple[str, str]]
+
+
+def normalize_word(word: str, rules: Rules = NORMALIZE_RULES) -> str:
+    for old, new in rules:
+        word = word.replace(old, new)
+    return word
+
+
+def check_row(db_id, word, rules: Rules = NORMALIZE_RULES) -> Tuple[Optional[str], Optional[tuple]]:
+    # words row 하나를 정규화 + 검사
+    # 반환: (정규화한 단어, None) or 문제가 있으면 (None, 격리할 (db_id, 원래 word, 사유))
+    if not isinstance(db_id, int):
+        return None, (repr(db_id), repr(word), "id가 정수가 아님")
+    if not isinstance(word, str):
+        return None, (db_id, repr(word), f"word가 문자열이 아님 ({type(word).__name__})")
+
+    cur_word = normalize_word(word, rules)
+    if not cur_word.strip():
+        return None, (db_id, word, "정규화하면 빈 단어")
+    return cur_word, None
+
+
+def normalize_batch(rows: list, rules: Rules = NORMALIZE_RULES) -> Tuple[List[Tuple[str, int]], list]:
+    # DB row batch 하나를 정규화 + 검사
+    # 반환: ((word, db_id) 목록, 격리된 (db_id, 원래 word, 사유) 목록)
+    items = []
+    quarantined = []
+    for db_id, word in rows:
+        cur_word, problem = check_row(db_id, word, rules)
+        if problem is None:
+            items.append((cur_word, db_id))
+        else:
+            quarantined.append(problem)
+    return items, quarantined
+
+
+def generate_dataset(keep: Optional[Callable[[str], bool]] = None, rules: Rules = NORMALIZE_RULES,
+                     quarantine_path: Optional[str] = None) -> CompressedTrie:
+    # 단계별 구축
+    #   1. DB에서 batch 단위로 읽음
+    #   2. batch마다 정규화 / 검사
+    #   3. batch를 받는 즉시 trie에 넣음 (전체 결과를 list로 들고 있지 않음)
+    # 문제가 있는 row는 멈추지 않고 따로 모아서 보고 (quarantine_path가 있으면 JSON lines로 저장)
+    # 2단계를 process pool로 나누지 않는 이유: 정규화는 구축 시간의 일부일 뿐이고 batch를 옮기는(pickle) 비용과 비슷함
+    # (process마다 따로 trie를 들고 쓰는 경우는 shard.py의 INDEX_SHARDS 모드)
+    start = time.time()
+    data_trie = CompressedTrie()
+    quarantined = []
+
+    with tqdm(unit=" rows") as progress:
+        for rows in iter_word_batches():
+            batch_items, batch_quarantined = normalize_batch(rows, rules)
+            progress.update(len(rows))
+            for cur_word, db_id in batch_items:
+                if keep is None or keep(cur_word):
+                    data_trie.insert(cur_word, db_id)
+            quarantined.extend(batch_quarantined)
+
+    if quarantined:
+        report_quarantine(quarantined, quarantine_path)
+
+    print(f"generate trie time: {time.time() - start}")
+    print(f"trie node cnt: {data_trie.node_cnt}")
+    return data_trie
+
+
+def report_quarantine(quarantined: list, path: Optional[str] = None):
+    print(f"quarantined rows: {len(quarantined)}")
+    for db_id, word, reason in quarantined[:10]:
+        print(f"  {db_id} {word!r}: {reason}")
+
+    if path:
+        with open(path, "w", encoding="utf-8") as f:
+            for db_id, word, reason in quarantined:
+                f.write(json.dumps({"id": db_id, "word": word, "reason": reason}, ensure_ascii=False) + "\n")
+        print(f"quarantined rows saved: {path}")
+
+
+def build_trie(ranking: Optional[str] = None, top_k: int = 15, keep: Optional[Callable[[str], bool]] = None,
+               quarantine_path: Optional[str] = None) -> CompressedTrie:
+    trie = generate_dataset(keep, quarantine_path=quarantine_path)
+
+    if ranking:
+        start = time.time()
+        trie.build_top_k(top_k, ranking)
+        print(f"build top-k time: {time.time() - start}")
+
+    return trie
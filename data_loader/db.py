@@ -1,5 +1,14 @@
-import mysql.connector
+import asyncio
+import os
+import threading
 import time
+from contextlib import asynccontextmanager
+from functools import lru_cache
+
+import mysql.connector
+
+from .cache import LRUCache
+from .metrics import registry
 
 
 def get_connection():
@@ -45,6 +54,79 @@ def create_table():
     conn.close()
 
 
+def create_change_log():
+    # words의 수정/삭제 기록 (추가는 id가 증가하므로 words 테이블만 보면 됨)
+    # change feed를 켜고 시작할 때마다 호출되므로 이미 있으면 그대로 둠
+    # (trigger를 지우고 다시 만들면 그 사이의 수정/삭제가 기록되지 않음)
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS word_changes (
+        seq BIGINT AUTO_INCREMENT PRIMARY KEY,
+        word_id INT NOT NULL,
+        old_word VARCHAR(100) NOT NULL,
+        new_word VARCHAR(100) NULL,
+        changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    """)
+    cursor.execute("""
+        SELECT TRIGGER_NAME FROM information_schema.TRIGGERS
+        WHERE TRIGGER_SCHEMA = DATABASE() AND TRIGGER_NAME IN ('words_after_update', 'words_after_delete')
+    """)
+    existing = {name for name, in cursor.fetchall()}
+    if "words_after_update" not in existing:
+        cursor.execute("""
+        CREATE TRIGGER words_after_update AFTER UPDATE ON words FOR EACH ROW
+            INSERT INTO word_changes (word_id, old_word, new_word) VALUES (OLD.id, OLD.word, NEW.word)
+        """)
+    if "words_after_delete" not in existing:
+        cursor.execute("""
+        CREATE TRIGGER words_after_delete AFTER DELETE ON words FOR EACH ROW
+            INSERT INTO word_changes (word_id, old_word, new_word) VALUES (OLD.id, OLD.word, NULL)
+        """)
+
+    cursor.close()
+    conn.close()
+
+
+def fetch_change_positions():
+    # 현재까지 반영된 위치 (words의 최대 id, word_changes의 최대 seq)
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute("SELECT COALESCE(MAX(id), 0) FROM words")
+    last_id = cursor.fetchone()[0]
+    cursor.execute("SELECT COALESCE(MAX(seq), 0) FROM word_changes")
+    last_seq = cursor.fetchone()[0]
+
+    cursor.close()
+    conn.close()
+
+    return last_id, last_seq
+
+
+def fetch_leading_char_counts():
+    # 정규화(dataset.normalize_word)한 단어의 첫 글자별 단어 수 -> shard 범위를 나눌 때 사용
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute("""
+        SELECT LEFT(REPLACE(REPLACE(word, '-', ''), '^', ' '), 1) AS lead, COUNT(*)
+        FROM words
+        GROUP BY lead
+    """)
+    counts = {}
+    for lead, count in cursor.fetchall():
+        # collation에 따라 대소문자 등이 한 그룹으로 묶여 올 수 있음 (균형을 맞추는 용도라 상관없음)
+        counts[lead] = counts.get(lead, 0) + count
+
+    cursor.close()
+    conn.close()
+
+    return counts
+
+
 def insert_word(word, type_, sense_no, pos):
     conn = get_connection()
     cursor = conn.cursor()
@@ -91,6 +173,31 @@ def fetchall():
 
     return a
 
+def iter_word_batches(batch_size: int = 10000):
+    return _iter_batches("SELECT id, word FROM words", batch_size)
+
+def iter_entry_batches(batch_size: int = 10000):
+    # 상세 조회용 row 전체 (컬럼 순서는 SELECT *와 같음), id 순서대로
+    return _iter_batches("SELECT id, word, type, sense_no, pos, definition, created_at FROM words ORDER BY id",
+                         batch_size)
+
+def _iter_batches(sql: str, batch_size: int):
+    # fetchall 대신 unbuffered cursor로 batch_size개씩 받아오면서 바로 넘겨줌
+    # -> 전체 결과(약 700MB)를 한 번에 메모리에 올리지 않음
+    conn = get_connection()
+    cursor = conn.cursor(buffered=False)
+
+    try:
+        cursor.execute(sql)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        cursor.close()
+        conn.close()
+
 def fetchall_by_id(ids: list):
     if not ids:
         return []
@@ -108,34 +215,151 @@ def fetchall_by_id(ids: list):
     return results
 
 
+# 이 시간(초)보다 오래 쉬었던 connection은 쓰기 전에 살아있는지 확인
+DB_POOL_PING_AFTER = float(os.environ.get("DB_POOL_PING_AFTER", 30))
+
+
+class PooledConnection:
+    # connection 하나 + 그 connection에서 prepare해둔 statement(cursor)들
+    def __init__(self):
+        self.conn = get_connection()
+        self.statements = {}  # sql -> prepared cursor
+        self.last_used = time.monotonic()
+        # 요청이 취소돼도 thread의 쿼리는 끝까지 실행됨 -> close는 쿼리가 끝난 뒤에
+        self.lock = threading.Lock()
+
+    def execute(self, sql: str, params: tuple) -> list:
+        with self.lock:
+            if time.monotonic() - self.last_used > DB_POOL_PING_AFTER:
+                self._reconnect_if_closed()
+            cursor = self.statements.get(sql)
+            if cursor is None:
+                cursor = self.statements[sql] = self.conn.cursor(prepared=True)
+            # 같은 sql 객체로 다시 실행하면 prepare 없이 바로 execute만 함
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+            self.last_used = time.monotonic()
+            return rows
+
+    def _reconnect_if_closed(self):
+        # 한동안 쓰지 않은 connection은 서버가 이미 끊었을 수 있음 (wait_timeout)
+        # -> 쿼리 전에 ping, 끊겼으면 다시 연결 (요청이 500으로 실패한 뒤에야 버려지지 않도록)
+        # prepare해둔 statement는 이전 session에 속하므로 다시 연결됐으면 버림
+        connection_id = self.conn.connection_id
+        self.conn.ping(reconnect=True, attempts=1)
+        if self.conn.connection_id != connection_id:
+            self.statements = {}
+
+    def close(self):
+        with self.lock:
+            for cursor in self.statements.values():
+                cursor.close()
+            self.conn.close()
+
+
+class ConnectionPool:
+    # mysql.connector는 blocking이므로 쿼리는 thread에서 실행하고,
+    # 동시에 사용하는 connection 수는 size개로 제한 (connection은 필요할 때 만들고 재사용)
+    def __init__(self, size: int):
+        self.size = size
+        self._idle = []
+        self._available = None
+
+    async def open(self):
+        self._available = asyncio.Semaphore(self.size)
+
+    async def close(self):
+        idle, self._idle = self._idle, []
+        for conn in idle:
+            await asyncio.to_thread(conn.close)
+
+    @asynccontextmanager
+    async def connection(self):
+        async with self._available:
+            conn = self._idle.pop() if self._idle else await asyncio.to_thread(PooledConnection)
+            try:
+                yield conn
+            except BaseException:
+                # 상태를 알 수 없는 connection은 재사용하지 않음 (요청 취소로 생기는 CancelledError도 포함)
+                # 쿼리가 thread에서 아직 실행 중일 수 있으므로 기다리지 않고 thread에서 닫음 (쿼리가 끝나면 닫힘)
+                asyncio.get_running_loop().run_in_executor(None, conn.close)
+                raise
+            self._idle.append(conn)
+
+    async def fetchall(self, sql: str, params: tuple) -> list:
+        async with self.connection() as conn:
+            return await asyncio.to_thread(conn.execute, sql, params)
+
+
+pool = ConnectionPool(int(os.environ.get("DB_POOL_SIZE", 8)))
+
+# id -> words row 전체 (사전 상세 조회는 같은 항목이 반복해서 조회됨)
+row_cache = LRUCache(int(os.environ.get("ROW_CACHE_SIZE", 50000)))
+
+DB_FETCH_BY_IDS_SECONDS = registry.histogram("db_fetch_by_ids_seconds", "fetchall_by_ids의 DB 왕복 시간 (캐시에 없는 id만 조회)")
+DB_FETCH_BY_WORD_SECONDS = registry.histogram("db_fetch_by_word_seconds", "fetchall_by_word의 DB 왕복 시간")
+registry.gauge("row_cache_hits", "row 캐시 hit 수", lambda: row_cache.hits)
+registry.gauge("row_cache_misses", "row 캐시 miss 수", lambda: row_cache.misses)
+
+SELECT_BY_WORD_SQL = "SELECT * FROM words WHERE word = %s"
+SELECT_NEW_WORDS_SQL = "SELECT id, word FROM words WHERE id > %s ORDER BY id LIMIT %s"
+SELECT_WORD_CHANGES_SQL = "SELECT seq, word_id, old_word, new_word FROM word_changes WHERE seq > %s ORDER BY seq LIMIT %s"
+
+
+@lru_cache(maxsize=None)
+def _select_by_ids_sql(size: int) -> str:
+    # id 개수마다 statement가 달라지지 않도록 2의 거듭제곱 크기로 맞춤 (부족한 자리는 마지막 id 반복)
+    placeholders = ','.join(['%s'] * size)
+    return f"SELECT * FROM words WHERE id IN ({placeholders})"
+
+
 async def fetchall_by_ids(ids: list):
-    if not ids:
-        return []
+    # 캐시에 있는 row는 그대로 쓰고, 없는 id만 DB에서 가져옴 (결과는 요청한 id 순서)
+    ids = list(dict.fromkeys(int(db_id) for db_id in ids if str(db_id).isdigit()))
+    rows = {}
+    missing = []
+    for db_id in ids:
+        row = row_cache.get(db_id)
+        if row is None:
+            missing.append(db_id)
+        else:
+            rows[db_id] = row
 
-    conn = get_connection()
-    cursor = conn.cursor()
+    if missing:
+        with DB_FETCH_BY_IDS_SECONDS.time():
+            fetched = await _select_by_ids(missing)
+        for row in fetched:
+            row_cache.put(row[0], row)
+            rows[row[0]] = row
 
-    # IN 절을 동적으로 구성
-    placeholders = ','.join(['%s'] * len(ids))
-    sql = f"SELECT * FROM words WHERE id IN ({placeholders})"
+    return [rows[db_id] for db_id in ids if db_id in rows]
 
-    cursor.execute(sql, ids)
-    results = cursor.fetchall()
 
-    return results
+async def fetch_new_words(last_id: int, limit: int):
+    return await pool.fetchall(SELECT_NEW_WORDS_SQL, (last_id, limit))
 
 
-def fetchall_by_word(word):
-    conn = get_connection()
-    cursor = conn.cursor()
+async def fetch_word_changes(last_seq: int, limit: int):
+    return await pool.fetchall(SELECT_WORD_CHANGES_SQL, (last_seq, limit))
 
-    # IN 절을 동적으로 구성
-    sql = f"SELECT * FROM words WHERE word = %s"
 
-    cursor.execute(sql, (word,))
-    results = cursor.fetchall()
+def invalidate_rows(ids: list):
+    # words row가 바뀌었을 때 호출 (다음 조회 때 DB에서 다시 가져옴)
+    row_cache.invalidate(int(db_id) for db_id in ids)
 
-    return results
+
+async def _select_by_ids(ids: list):
+    if not ids:
+        return []
+
+    size = 1 << (len(ids) - 1).bit_length()
+    params = tuple(ids) + (ids[-1],) * (size - len(ids))
+    return await pool.fetchall(_select_by_ids_sql(size), params)
+
+
+async def fetchall_by_word(word):
+    with DB_FETCH_BY_WORD_SECONDS.time():
+        return await pool.fetchall(SELECT_BY_WORD_SQL, (word,))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,133 @@
+import sys
+from array import array
+from bisect import bisect_left
+from typing import List, Optional
+
+from .metrics import registry
+from .snapshot import open_sections, write_sections
+
+# words 테이블의 상세 조회용 row를 파일 하나로 export해두고 mmap해서 읽음
+# -> /search/words, /search/word가 DB 왕복 없이 처리되고, DB가 내려가도 상세 조회는 계속 됨
+# 파일 구조는 snapshot.py와 같은 section 형식
+#   ids        : row마다 words.id (오름차순) -> id 조회는 binary search
+#   field_off  : row i의 j번째 필드 = text[field_off[i * FIELDS + j]:field_off[i * FIELDS + j + 1]]
+#   text       : 모든 필드의 UTF-8 bytes를 이어붙인 것
+#   word_order : word(UTF-8 bytes) 순서로 정렬한 row 번호 -> word 조회도 binary search
+ENTRY_MAGIC = b"ACENTRY\0"
+ENTRY_VERSION = 1
+
+# id 다음 컬럼들 (SELECT *와 같은 순서), created_at은 JSON 응답과 같은 ISO 형식 문자열로 저장
+FIELDS = ("word", "type", "sense_no", "pos", "definition", "created_at")
+_WORD = FIELDS.index("word")
+
+LOOKUP_SECONDS = registry.histogram("entry_store_lookup_seconds", "entry store 조회 시간")
+
+
+class EntryStore:
+    def __init__(self, ids, field_off, text, word_order):
+        self.ids = ids
+        self.field_off = field_off
+        self.text = text
+        self.word_order = word_order
+        self.mmap = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def fetch_by_ids(self, ids: list) -> List[tuple]:
+        # db.fetchall_by_ids와 같은 형식 (요청한 id 순서, 없는 id는 빠짐)
+        with LOOKUP_SECONDS.time():
+            ids = dict.fromkeys(int(db_id) for db_id in ids if str(db_id).isdigit())
+            rows = []
+            for db_id in ids:
+                row = self._find(db_id)
+                if row is not None:
+                    rows.append(self._row(row))
+            return rows
+
+    def fetch_by_word(self, word: str) -> List[tuple]:
+        # db.fetchall_by_word와 같은 형식 (단, DB collation과 달리 정확히 같은 단어만)
+        with LOOKUP_SECONDS.time():
+            key = word.encode()
+            order = self.word_order
+            i = bisect_left(order, key, key=lambda row: self._field(row, _WORD))
+            rows = []
+            while i < len(order) and self._field(order[i], _WORD) == key:
+                rows.append(self._row(order[i]))
+                i += 1
+            # 같은 단어끼리는 id 순서
+            rows.sort()
+            return rows
+
+    def _find(self, db_id: int) -> Optional[int]:
+        i = bisect_left(self.ids, db_id)
+        if i < len(self.ids) and self.ids[i] == db_id:
+            return i
+        return None
+
+    def _field(self, row: int, field: int) -> bytes:
+        pos = row * len(FIELDS) + field
+        return bytes(self.text[self.field_off[pos]:self.field_off[pos + 1]])
+
+    def _row(self, row: int) -> tuple:
+        start = row * len(FIELDS)
+        off = self.field_off[start:start + len(FIELDS) + 1]
+        data = bytes(self.text[off[0]:off[-1]])
+        base = off[0]
+        return (self.ids[row], *(data[a - base:b - base].decode() for a, b in zip(off, off[1:])))
+
+
+def export_entries(path: str, batch_size: int = 10000) -> int:
+    # DB의 words row 전체를 entry store 파일로 저장, 저장한 row 수를 반환
+    from .db import iter_entry_batches
+
+    ids = array("q")
+    field_off = array("Q", [0])
+    text = bytearray()
+    words = []
+
+    for rows in iter_entry_batches(batch_size):
+        for db_id, *values in rows:
+            ids.append(db_id)
+            for field, value in zip(FIELDS, values):
+                if field == "created_at" and value is not None:
+                    value = value.isoformat()
+                data = ("" if value is None else str(value)).encode()
+                if field == "word":
+                    words.append(data)
+                text += data
+                field_off.append(len(text))
+
+    word_order = array("I", sorted(range(len(words)), key=words.__getitem__))
+    del words
+
+    write_sections(path, ENTRY_MAGIC, ENTRY_VERSION, {
+        "ids": ("q", ids),
+        "field_off": ("Q", field_off),
+        "text": ("B", text),
+        "word_order": ("I", word_order),
+    })
+    return len(ids)
+
+
+def load_entries(path: str) -> EntryStore:
+    mm, sections = open_sections(path, ENTRY_MAGIC, ENTRY_VERSION)
+    store = EntryStore(**sections)
+    store.mmap = mm  # mmap이 닫히지 않도록 참조 유지
+    return store
+
+
+if __name__ == '__main__':
+    # words 테이블이 바뀌었을 때 offline으로 다시 export (trie snapshot과 같은 시점에 만드는 것을 권장)
+    # 사용법: python -m data_loader.entry_store entries.store
+    import time
+
+    entries_path = sys.argv[1]
+
+    start = time.time()
+    count = export_entries(entries_path)
+    print(f"export entries time: {time.time() - start} ({count} rows)")
+
+    start = time.time()
+    load_entries(entries_path)
+    print(f"load entries time: {time.time() - start}")
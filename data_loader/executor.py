@@ -0,0 +1,185 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Optional
+
+from .metrics import registry
+
+# trie 검색처럼 CPU를 쓰는 작업을 event loop 밖(thread pool)에서 실행
+#   - 동시에 받아들이는 작업 수 제한 (넘으면 바로 거절 -> 대기열이 끝없이 길어지지 않음)
+#   - 작업마다 time budget, 넘기면 응답은 바로 돌려주고 thread 쪽 작업은 다음 checkpoint()에서 멈춤
+#   - 요청한 쪽이 사라지면 (client 연결 끊김, 더 새로운 입력) 같은 방식으로 취소
+# GIL 때문에 검색이 더 빨라지지는 않지만, 무거운 검색 하나가 다른 요청(DB 조회 등)을 막지 않게 됨
+
+QUEUE_SECONDS = registry.histogram("search_queue_seconds", "검색 작업이 thread를 기다린 시간")
+RUN_SECONDS = registry.histogram("search_run_seconds", "검색 작업이 thread에서 실행된 시간")
+REJECTED = registry.counter("search_rejected_total", "대기 작업이 너무 많아서 거절한 검색 수")
+TIMED_OUT = registry.counter("search_timeout_total", "time budget을 넘긴 검색 수")
+CANCELLED = registry.counter("search_cancelled_total", "요청한 쪽이 사라져서 취소한 검색 수")
+
+
+class SearchRejected(Exception):
+    pass
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+class SearchCancelled(Exception):
+    pass
+
+
+class ReadWriteLock:
+    # 검색(read)끼리는 동시에, trie 변경(write)은 혼자 실행
+    # 기다리는 writer가 있으면 새 reader는 기다림 (change feed가 계속 밀리지 않도록)
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+
+    @contextmanager
+    def read(self):
+        with self._cond:
+            while self._writer or self._waiting_writers:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._cond:
+            self._waiting_writers += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._waiting_writers -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
+
+class _Task:
+    __slots__ = ("deadline", "cancelled")
+
+    def __init__(self, deadline: Optional[float]):
+        self.deadline = deadline
+        self.cancelled = False
+
+
+_local = threading.local()
+
+
+def checkpoint():
+    # 검색 loop 중간중간 호출 -> 취소됐거나 budget을 넘겼으면 SearchCancelled로 빠져나감
+    # (executor 밖에서 호출되면 아무것도 하지 않음)
+    task = getattr(_local, "task", None)
+    if task is not None and (task.cancelled or (task.deadline is not None and time.perf_counter() > task.deadline)):
+        raise SearchCancelled()
+
+
+def remaining_budget(default: Optional[float] = None) -> Optional[float]:
+    # 현재 작업에 남은 시간 (오타 검색처럼 자체 time budget이 있는 함수에 넘겨줄 때)
+    task = getattr(_local, "task", None)
+    if task is None or task.deadline is None:
+        return default
+    remaining = max(task.deadline - time.perf_counter(), 0.0)
+    return remaining if default is None else min(default, remaining)
+
+
+class SearchExecutor:
+    def __init__(self, workers: int, max_pending: int, time_budget: Optional[float], poll_interval: float = 0.02):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.time_budget = time_budget
+        self.poll_interval = poll_interval
+        self.lock = ReadWriteLock()
+        self.pending = 0  # 실행 중 + 대기 중 (취소된 작업도 thread에서 끝날 때까지 셈)
+        self._pool = None
+
+    def open(self):
+        self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix="search")
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def run(self, fn: Callable, *args, is_cancelled: Callable[[], Awaitable[bool]] = None):
+        if self.pending >= self.max_pending:
+            REJECTED.inc()
+            raise SearchRejected()
+
+        submitted = time.perf_counter()
+        task = _Task(submitted + self.time_budget if self.time_budget is not None else None)
+        self.pending += 1
+        future = asyncio.get_running_loop().run_in_executor(self._pool, self._call, task, submitted, fn, args)
+        future.add_done_callback(self._done)
+
+        # 끝날 때까지 poll_interval마다 요청한 쪽이 아직 기다리는지 확인
+        try:
+            while True:
+                timeout = self.poll_interval
+                if task.deadline is not None:
+                    timeout = min(timeout, max(task.deadline - time.perf_counter(), 0.0))
+                done, _ = await asyncio.wait({future}, timeout=timeout)
+                if done:
+                    try:
+                        return future.result()
+                    except SearchCancelled:
+                        # thread 쪽 checkpoint()에서 먼저 budget 초과를 발견한 경우
+                        if task.cancelled:
+                            raise
+                        TIMED_OUT.inc()
+                        raise SearchTimeout() from None
+
+                if task.deadline is not None and time.perf_counter() >= task.deadline:
+                    task.cancelled = True
+                    TIMED_OUT.inc()
+                    raise SearchTimeout()
+                if is_cancelled is not None and await is_cancelled():
+                    task.cancelled = True
+                    CANCELLED.inc()
+                    raise SearchCancelled()
+        except asyncio.CancelledError:
+            # 기다리던 coroutine 자체가 취소됨 (websocket 종료 등)
+            task.cancelled = True
+            raise
+
+    async def exclusive(self, fn: Callable, *args):
+        # 검색이 없는 동안에만 실행 (trie를 바꾸는 작업), 검색과 달리 budget / 취소 없음
+        def call():
+            with self.lock.write():
+                return fn(*args)
+        return await asyncio.get_running_loop().run_in_executor(self._pool, call)
+
+    def _call(self, task: _Task, submitted: float, fn: Callable, args: tuple):
+        started = time.perf_counter()
+        QUEUE_SECONDS.observe(started - submitted)
+        _local.task = task
+        try:
+            # 기다리는 동안 이미 취소됐으면 시작하지 않음
+            checkpoint()
+            with self.lock.read():
+                return fn(*args)
+        finally:
+            _local.task = None
+            RUN_SECONDS.observe(time.perf_counter() - started)
+
+    def _done(self, future):
+        self.pending -= 1
+        if not future.cancelled():
+            # 이미 응답을 돌려준 (취소된) 작업의 예외는 무시
+            future.exception()
@@ -0,0 +1,230 @@
+from array import array
+from bisect import bisect_left
+from collections import deque
+from itertools import islice
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+
+class FrozenTrie:
+    # CompressedTrie를 읽기 전용 flat 배열로 바꾼 형태
+    # node 객체 대신 BFS 순서의 번호(0 = root)로 node를 가리키고, 모든 정보는 배열 몇 개에 몰아서 저장
+    #   labels     : 모든 edge 문자열(UTF-8)을 이어붙인 하나의 buffer
+    #   label_off  : node i로 들어오는 edge = labels[label_off[i]:label_off[i + 1]]
+    #   first_char : edge 첫 글자의 code point (형제끼리는 겹치지 않으므로 이걸로 정렬 + 이분 탐색)
+    #   child_off  : node i의 자식들 = child_off[i] ~ child_off[i + 1] - 1 (BFS라서 자식들이 연속됨)
+    #   ids_off    : node i의 DB ID들 = postings[ids_off[i]:ids_off[i + 1]] (비어있으면 단어 끝이 아님)
+    #   parent     : 부모 node 번호 (top_k 결과의 단어를 복원할 때 사용)
+    #   topk_off   : node i의 top_k 결과 = topk[topk_off[i]:topk_off[i + 1]] (단어 끝 node 번호들)
+    def __init__(self, labels: bytes, label_off: Sequence[int], first_char: Sequence[int],
+                 child_off: Sequence[int], ids_off: Sequence[int], postings: Sequence[int],
+                 parent: Sequence[int], topk_off: Sequence[int], topk: Sequence[int], top_k_size: int = 0):
+        self.labels = labels
+        self.label_off = label_off
+        self.first_char = first_char
+        self.child_off = child_off
+        self.ids_off = ids_off
+        self.postings = postings
+        self.parent = parent
+        self.topk_off = topk_off
+        self.topk = topk
+        self.top_k_size = top_k_size
+        self.node_cnt = len(first_char)
+        self.root = 0
+        self.version = 0  # 읽기 전용이므로 바뀌지 않음
+        self.nodes_visited = 0  # 탐색하면서 거친 node 수 누적 (/metrics 용)
+
+    @classmethod
+    def from_trie(cls, trie) -> "FrozenTrie":
+        labels = bytearray()
+        label_off = array('Q', [0])
+        first_char = array('I')
+        child_off = array('I')
+        ids_off = array('Q', [0])
+        postings = array('q')
+        parent = array('I')
+        word_index = {}  # top_k 변환용: 단어 -> node 번호
+
+        # BFS로 번호를 매기면 한 node의 자식들이 연속된 번호를 가짐
+        queue = deque([(trie.root, "", 0)])
+        next_idx = 1
+        idx = 0
+        while queue:
+            node, path, parent_idx = queue.popleft()
+            labels += node.edge.encode()
+            label_off.append(len(labels))
+            first_char.append(ord(node.edge[0]) if node.edge else 0)
+            parent.append(parent_idx)
+
+            if node.is_end_of_word:
+                postings.extend(node.ids)  # 이미 정렬됨
+                word_index[path] = idx
+            ids_off.append(len(postings))
+
+            child_off.append(next_idx)
+            for char in sorted(node.children):
+                child = node.children[char]
+                queue.append((child, path + child.edge, idx))
+                next_idx += 1
+            idx += 1
+        child_off.append(next_idx)
+
+        topk_off = array('I', [0])
+        topk = array('I')
+        if trie.top_k_size:
+            # top_k 목록의 단어들을 단어 끝 node 번호로 바꿔서 저장
+            queue = deque([trie.root])
+            while queue:
+                node = queue.popleft()
+                topk.extend(word_index[word] for _, word, _ in node.top_k)
+                topk_off.append(len(topk))
+                queue.extend(node.children[char] for char in sorted(node.children))
+
+        return cls(bytes(labels), label_off, first_char, child_off, ids_off, postings,
+                   parent, topk_off, topk, trie.top_k_size)
+
+    def search_prefix(self, prefix: str, limit: Optional[int] = None) -> List[Tuple[str, Sequence[int]]]:
+        found = self._find_node(prefix)
+        if found is None:
+            return []
+        return self._search_node(*found, limit)
+
+    def _search_node(self, node: int, path: str, limit: Optional[int]) -> List[Tuple[str, Sequence[int]]]:
+        if limit is not None and limit <= self.top_k_size:
+            start, end = self.topk_off[node], self.topk_off[node + 1]
+            return [(self._word(i), self._ids(i)) for i in self.topk[start:min(end, start + limit)]]
+
+        return list(islice(self._iter_all_words(node, path), limit))
+
+    def cursor(self):
+        from .cursor import PrefixCursor
+        return PrefixCursor(self)
+
+    def get(self, word: str) -> Optional[Sequence[int]]:
+        found = self._find_node(word)
+        if found is None or found[1] != word or not self._is_end(found[0]):
+            return None
+        return self._ids(found[0])
+
+    def iter_prefix(self, prefix: str, after: Optional[str] = None) -> Iterator[Tuple[str, Sequence[int]]]:
+        found = self._find_node(prefix)
+        if found is None:
+            return iter(())
+
+        node, path = found
+        if after is None:
+            return self._iter_all_words(node, path)
+        return self._iter_after(node, path, after)
+
+    def search_fuzzy(self, query: str, max_dist: int = 1, limit: Optional[int] = 15,
+                     time_budget: Optional[float] = 0.1) -> Tuple[List[Tuple[str, Sequence[int]]], bool]:
+        from .fuzzy import search_fuzzy
+        return search_fuzzy(self, query, max_dist, limit, time_budget)
+
+    def iter_word_nodes(self) -> Iterator[Tuple[str, int]]:
+        # (단어, 단어 끝 node 번호)를 사전 순으로 (node 번호로 단어를 가리키는 index를 만들 때 사용)
+        stack = [(0, "")]
+        while stack:
+            node, path = stack.pop()
+            if self._is_end(node):
+                yield path, node
+            stack.extend((child, path + edge) for edge, child in reversed(list(self._children(node))))
+
+    def _children(self, node: int) -> Iterator[Tuple[str, int]]:
+        for child in range(self.child_off[node], self.child_off[node + 1]):
+            yield self._edge(child), child
+
+    def _edge(self, node: int) -> str:
+        return bytes(self.labels[self.label_off[node]:self.label_off[node + 1]]).decode()
+
+    def _ids(self, node: int) -> Sequence[int]:
+        return self.postings[self.ids_off[node]:self.ids_off[node + 1]]
+
+    def _is_end(self, node: int) -> bool:
+        return self.ids_off[node + 1] > self.ids_off[node]
+
+    def _child(self, node: int, char: str) -> Optional[int]:
+        # 형제들은 first_char 기준으로 정렬되어 있으므로 이분 탐색
+        lo, hi = self.child_off[node], self.child_off[node + 1]
+        code = ord(char)
+        i = bisect_left(self.first_char, code, lo, hi)
+        if i < hi and self.first_char[i] == code:
+            return i
+        return None
+
+    def _word(self, node: int) -> str:
+        edges = []
+        while node:
+            edges.append(self._edge(node))
+            node = self.parent[node]
+        return "".join(reversed(edges))
+
+    def _find_node(self, prefix: str) -> Optional[Tuple[int, str]]:
+        node = 0
+        path = ""
+
+        while prefix:
+            self.nodes_visited += 1
+            child = self._child(node, prefix[0])
+            if child is None:
+                return None
+
+            edge = self._edge(child)
+            if edge.startswith(prefix):
+                return child, path + edge
+            if not prefix.startswith(edge):
+                return None
+
+            prefix = prefix[len(edge):]
+            path += edge
+            node = child
+
+        return node, path
+
+    def _iter_all_words(self, node: int, prefix: str) -> Iterator[Tuple[str, Sequence[int]]]:
+        if self._is_end(node):
+            yield prefix, self._ids(node)
+
+        yield from self._walk([(prefix, self.child_off[node], self.child_off[node + 1])])
+
+    def _iter_after(self, node: int, prefix: str, after: str) -> Iterator[Tuple[str, Sequence[int]]]:
+        # 형제들이 정렬되어 있으므로 after가 없어졌더라도 있었을 위치 바로 다음부터 이어갈 수 있음
+        stack = [(prefix, self.child_off[node], self.child_off[node + 1])]
+        rest = after[len(prefix):] if after.startswith(prefix) else ""
+        while rest:
+            path, _, end = stack[-1]
+            code = ord(rest[0])
+            child = bisect_left(self.first_char, code, self.child_off[node], end)
+            if child == end or self.first_char[child] != code:
+                stack[-1] = (path, child, end)
+                break
+
+            edge = self._edge(child)
+            if not rest.startswith(edge):
+                stack[-1] = (path, child + 1 if rest > edge else child, end)
+                break
+
+            stack[-1] = (path, child + 1, end)
+            stack.append((path + edge, self.child_off[child], self.child_off[child + 1]))
+            rest = rest[len(edge):]
+            node = child
+
+        return self._walk(stack)
+
+    def _walk(self, stack: list) -> Iterator[Tuple[str, Sequence[int]]]:
+        visited = 0
+        try:
+            while stack:
+                path, child, end = stack[-1]
+                if child == end:
+                    stack.pop()
+                    continue
+
+                visited += 1
+                stack[-1] = (path, child + 1, end)
+                word = path + self._edge(child)
+                if self._is_end(child):
+                    yield word, self._ids(child)
+                if self.child_off[child + 1] > self.child_off[child]:
+                    stack.append((word, self.child_off[child], self.child_off[child + 1]))
+        finally:
+            self.nodes_visited += visited
@@ -0,0 +1,87 @@
+import heapq
+import time
+from itertools import count
+from typing import List, Optional, Sequence, Tuple
+
+# 기본 time budget: benchmark.py 결과 기준 (300K 단어, budget 없이 fuzzy p50 약 10ms / p99 약 50ms)
+# -> p99의 2배 정도로 잡음, 넘기더라도 best-first라서 그때까지 찾은 가장 가까운 결과가 남음
+DEFAULT_TIME_BUDGET = 0.1
+
+
+def search_fuzzy(trie, query: str, max_dist: int = 1, limit: Optional[int] = 15,
+                 time_budget: Optional[float] = DEFAULT_TIME_BUDGET) -> Tuple[List[Tuple[str, Sequence[int]]], bool]:
+    # 오타 허용 prefix 검색: query와 편집 거리가 max_dist 이하인 prefix로 시작하는 단어들
+    # edge를 한 글자씩 내려가면서 Levenshtein DP의 한 행(row)만 갱신
+    #   row[j] = query[:j]와 지금까지의 경로 사이의 편집 거리
+    #   row[-1] <= max_dist  -> 그 아래 subtree는 전부 결과 (더 내려갈 필요 없음)
+    #   min(row) > max_dist  -> 더 내려가도 나아질 수 없으므로 가지치기
+    # SkipCompressedTrie(test/etc)처럼 skip 경우의 수마다 재귀하지 않으므로 각 node는 최대 한 번만 방문
+    # min(row)는 그 아래에서 나올 수 있는 편집 거리의 하한 -> 하한이 작은 node부터 탐색 (best-first)
+    # 따라서 결과는 편집 거리가 가까운 것부터 나오고, 중간에 멈춰도 가장 가까운 것들이 남음
+    # limit개가 모이거나 time_budget(초)을 넘기면 그때까지 찾은 것만 반환
+    # 반환: (결과, time_budget 때문에 중간에 멈췄는지)
+    if len(query) <= max_dist:
+        # query 전체를 지워도 되는 거리 -> 모든 단어가 후보가 되므로 오타 검색의 의미가 없음
+        return [], False
+
+    deadline = time.perf_counter() + time_budget if time_budget is not None else None
+    results = []
+    visited = 0
+
+    # (편집 거리 하한, 결과 subtree가 아니면 1, -깊이, 순서, node, 경로, row)
+    # 하한이 같으면 결과 subtree를 먼저, 그다음 깊은 node를 먼저 (결과에 가까운 쪽부터)
+    order = count()
+    heap = [(0, 1, 0, next(order), trie.root, "", list(range(len(query) + 1)))]
+    try:
+        while heap:
+            _, unmatched, _, _, node, path, parent_row = heapq.heappop(heap)
+            if not unmatched:
+                for item in trie._iter_all_words(node, path):
+                    results.append(item)
+                    if limit is not None and len(results) >= limit:
+                        return results, False
+                continue
+
+            for edge, child in _candidates(trie, node, query, parent_row, max_dist):
+                visited += 1
+                if deadline is not None and visited % 256 == 0 and time.perf_counter() > deadline:
+                    return results, True
+
+                row = parent_row
+                for char in edge:
+                    row = _next_row(query, row, char)
+                    if row[-1] <= max_dist or min(row) > max_dist:
+                        break
+
+                if row[-1] <= max_dist:
+                    heapq.heappush(heap, (row[-1], 0, 0, next(order), child, path + edge, row))
+                elif min(row) <= max_dist:
+                    heapq.heappush(heap, (min(row), 1, -len(path + edge), next(order), child, path + edge, row))
+
+        return results, False
+    finally:
+        trie.nodes_visited += visited
+
+
+def _candidates(trie, node, query: str, row: List[int], max_dist: int):
+    # row의 최솟값이 이미 max_dist이면 거리가 늘지 않는 방법은 query[j]와 같은 글자로 내려가는 것뿐
+    # (row[j] == max_dist인 j만) -> 자식 전체 대신 그 글자로 시작하는 자식만 찾음
+    # 얕은 node에서 거의 모든 자식의 row를 계산하던 것이 대부분 사라짐
+    if min(row) < max_dist:
+        yield from trie._children(node)
+        return
+    for char in {query[j] for j in range(len(query)) if row[j] == max_dist}:
+        child = trie._child(node, char)
+        if child is not None:
+            yield trie._edge(child), child
+
+
+def _next_row(query: str, row: List[int], char: str) -> List[int]:
+    new_row = [row[0] + 1]
+    for j, query_char in enumerate(query, 1):
+        new_row.append(min(
+            row[j] + 1,  # 경로에 글자가 더 있음
+            new_row[j - 1] + 1,  # query에 글자가 더 있음
+            row[j - 1] + (query_char != char),  # 일치 or 치환
+        ))
+    return new_row
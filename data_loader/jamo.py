@@ -0,0 +1,64 @@
+from itertools import islice
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from .compressed_trie import CompressedTrie
+from .frozen_trie import FrozenTrie
+
+# 한글 음절을 호환 자모로 분해 (겹모음/겹받침도 입력 순서대로 풀어서)
+#   자동완성 -> ㅈㅏㄷㅗㅇㅇㅗㅏㄴㅅㅓㅇ
+# 입력 중인 글자(자동와, 자동완ㅅ, ...)도 완성된 단어의 분해 결과의 prefix가 됨
+# 받침이 다음 글자의 초성으로 넘어가는 경우(간 -> 가나)도 같은 자모 순서이므로 그대로 매칭됨
+_CHO = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+_JUNG = ["ㅏ", "ㅐ", "ㅑ", "ㅒ", "ㅓ", "ㅔ", "ㅕ", "ㅖ", "ㅗ", "ㅗㅏ", "ㅗㅐ", "ㅗㅣ", "ㅛ", "ㅜ",
+         "ㅜㅓ", "ㅜㅔ", "ㅜㅣ", "ㅠ", "ㅡ", "ㅡㅣ", "ㅣ"]
+_JONG = ["", "ㄱ", "ㄲ", "ㄱㅅ", "ㄴ", "ㄴㅈ", "ㄴㅎ", "ㄷ", "ㄹ", "ㄹㄱ", "ㄹㅁ", "ㄹㅂ", "ㄹㅅ", "ㄹㅌ",
+         "ㄹㅍ", "ㄹㅎ", "ㅁ", "ㅂ", "ㅂㅅ", "ㅅ", "ㅆ", "ㅇ", "ㅈ", "ㅊ", "ㅋ", "ㅌ", "ㅍ", "ㅎ"]
+_COMPOUND = {
+    "ㄳ": "ㄱㅅ", "ㄵ": "ㄴㅈ", "ㄶ": "ㄴㅎ", "ㄺ": "ㄹㄱ", "ㄻ": "ㄹㅁ", "ㄼ": "ㄹㅂ", "ㄽ": "ㄹㅅ",
+    "ㄾ": "ㄹㅌ", "ㄿ": "ㄹㅍ", "ㅀ": "ㄹㅎ", "ㅄ": "ㅂㅅ",
+    "ㅘ": "ㅗㅏ", "ㅙ": "ㅗㅐ", "ㅚ": "ㅗㅣ", "ㅝ": "ㅜㅓ", "ㅞ": "ㅜㅔ", "ㅟ": "ㅜㅣ", "ㅢ": "ㅡㅣ",
+}
+
+_TABLE = {ord(char): jamo for char, jamo in _COMPOUND.items()}
+for _code in range(0xAC00, 0xD7A4):
+    _idx = _code - 0xAC00
+    _TABLE[_code] = _CHO[_idx // 588] + _JUNG[_idx % 588 // 28] + _JONG[_idx % 28]
+
+
+def to_jamo(text: str) -> str:
+    return text.translate(_TABLE)
+
+
+class JamoIndex:
+    # 자모 분해 결과를 key로 하는 별도의 trie
+    #   trie가 FrozenTrie : 값은 원래 trie의 단어 끝 node 번호, jamo_trie도 FrozenTrie
+    #                      -> 단어 목록을 따로 들고 있지 않고, snapshot에 같이 저장해서 mmap으로 읽을 수 있음
+    #   그 외 (CompressedTrie) : 값은 words 내 번호, DB ID는 기존 trie에서 찾아옴 (구축 시점 기준, change feed와는 함께 쓰지 않음)
+    def __init__(self, trie, jamo_trie, words: Optional[List[str]] = None):
+        self.trie = trie
+        self.jamo_trie = jamo_trie
+        self.words = words  # 정렬됨, node 번호로 가리킬 때는 None
+
+    @classmethod
+    def from_trie(cls, trie) -> "JamoIndex":
+        if isinstance(trie, FrozenTrie):
+            items = sorted((to_jamo(word), node) for word, node in trie.iter_word_nodes())
+            return cls(trie, CompressedTrie.from_sorted(items).freeze())
+
+        words = sorted(word for word, _ in trie.iter_prefix(""))
+        items = sorted((to_jamo(word), idx) for idx, word in enumerate(words))
+        return cls(trie, CompressedTrie.from_sorted(items), words)
+
+    def search_prefix(self, prefix: str, limit: Optional[int] = None) -> List[Tuple[str, Sequence[int]]]:
+        return list(islice(self.iter_prefix(prefix), limit))
+
+    def iter_prefix(self, prefix: str) -> Iterator[Tuple[str, Sequence[int]]]:
+        for _, idxs in self.jamo_trie.iter_prefix(to_jamo(prefix)):
+            for idx in idxs:
+                if self.words is None:
+                    yield self.trie._word(idx), self.trie._ids(idx)
+                    continue
+                word = self.words[idx]
+                ids = self.trie.get(word)
+                if ids is not None:
+                    yield word, ids
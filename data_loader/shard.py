@@ -0,0 +1,187 @@
+import multiprocessing
+import threading
+from bisect import bisect_right
+from itertools import chain, islice
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# 첫 글자 범위로 단어를 나눠서 shard마다 별도 process에 CompressedTrie를 하나씩 둠
+#   - 구축: shard process들이 동시에 DB를 읽으면서 자기 범위의 단어만 넣음 -> core 수만큼 병렬
+#   - 검색: prefix 검색은 첫 글자를 가진 shard 하나로만, 오타 / infix / 자모 검색은 전체 shard에 보내고 합침
+# 요청마다 pipe 왕복(pickle)이 추가되지만 process마다 GIL이 따로라서 검색 처리량이 shard 수만큼 늘어남
+# (server.py에서는 SearchExecutor의 thread들이 pipe 응답을 기다리는 동안 다른 shard 요청을 보낼 수 있음)
+
+PAGE_SIZE = 64  # iter_prefix가 shard에서 한 번에 가져오는 단어 수
+
+
+def plan_shards(counts: Dict[str, int], n: int) -> List[str]:
+    # 첫 글자별 단어 수를 보고 단어 수가 비슷하도록 n개 범위로 나눔
+    # 반환값 bounds: shard i = bounds[i - 1] <= 첫 글자 < bounds[i] (양 끝은 열려 있음)
+    total = sum(counts.values())
+    bounds = []
+    acc = 0
+    for char in sorted(counts):
+        if len(bounds) < n - 1 and acc >= total * (len(bounds) + 1) / n:
+            bounds.append(char)
+        acc += counts[char]
+    return bounds
+
+
+def shard_of(bounds: Sequence[str], word: str) -> int:
+    return bisect_right(bounds, word[:1])
+
+
+def _serve(conn, index: int, bounds: List[str], ranking: Optional[str], top_k: int, infix: bool, jamo: bool):
+    # shard process: 자기 범위의 trie를 구축한 뒤 (method, args) 요청을 하나씩 처리
+    from .cursor import iter_short_prefixes
+    from .dataset import build_trie
+    from .jamo import JamoIndex
+    from .substring_index import SubstringIndex
+
+    trie = build_trie(ranking, top_k, keep=lambda word: shard_of(bounds, word) == index)
+    substring_index = SubstringIndex.from_trie(trie) if infix else None
+    jamo_index = JamoIndex.from_trie(trie) if jamo else None
+
+    handlers = {
+        "search_prefix": trie.search_prefix,
+        "page": lambda prefix, after, n: list(islice(trie.iter_prefix(prefix, after), n)),
+        "get": trie.get,
+        "search_fuzzy": trie.search_fuzzy,
+        "short_prefixes": lambda max_len: list(iter_short_prefixes(trie, max_len)),
+        "infix": lambda query, limit: substring_index.search(query, limit),
+        "jamo": lambda prefix, limit: jamo_index.search_prefix(prefix, limit),
+    }
+    conn.send(trie.node_cnt)  # 구축 완료 신호
+
+    while True:
+        try:
+            method, args = conn.recv()
+        except EOFError:
+            break
+        try:
+            conn.send((True, handlers[method](*args)))
+        except Exception as e:
+            conn.send((False, e))
+
+
+class ShardedTrie:
+    # server.py에서 쓰는 trie 메서드들을 shard process 호출로 바꿔주는 대리 객체 (읽기 전용)
+    def __init__(self, bounds: List[str], conns: list, processes: list, node_cnt: int, top_k_size: int):
+        self.bounds = bounds
+        self.conns = conns
+        self.processes = processes
+        self.node_cnt = node_cnt
+        self.top_k_size = top_k_size
+        self.version = 0
+        self.nodes_visited = 0  # 각 shard process 안에서만 셈
+        self._locks = [threading.Lock() for _ in conns]
+
+    @classmethod
+    def start(cls, n: int, ranking: Optional[str] = None, top_k: int = 15,
+              infix: bool = False, jamo: bool = False) -> "ShardedTrie":
+        from .db import fetch_leading_char_counts
+
+        bounds = plan_shards(fetch_leading_char_counts(), n)
+        # fork하면 부모의 DB connection / thread 상태까지 복사되므로 spawn으로 새로 띄움
+        context = multiprocessing.get_context("spawn")
+        conns = []
+        processes = []
+        for index in range(len(bounds) + 1):
+            conn, child_conn = context.Pipe()
+            process = context.Process(target=_serve, args=(child_conn, index, bounds, ranking, top_k, infix, jamo),
+                                      daemon=True)
+            process.start()
+            conns.append(conn)
+            processes.append(process)
+
+        # 모든 shard가 동시에 구축되고, 전부 끝날 때까지 기다림
+        node_cnt = sum(conn.recv() for conn in conns)
+        return cls(bounds, conns, processes, node_cnt, top_k if ranking else 0)
+
+    def close(self):
+        for conn in self.conns:
+            conn.close()
+        for process in self.processes:
+            process.join(timeout=1)
+
+    def search_prefix(self, prefix: str, limit: Optional[int] = None) -> List[Tuple[str, Sequence[int]]]:
+        if prefix:
+            return self._call(shard_of(self.bounds, prefix), "search_prefix", prefix, limit)
+        return list(islice(chain.from_iterable(self._fan_out("search_prefix", prefix, limit)), limit))
+
+    def iter_prefix(self, prefix: str, after: Optional[str] = None) -> Iterator[Tuple[str, Sequence[int]]]:
+        # shard에서 PAGE_SIZE개씩 받아오면서 이어감 (필요한 만큼만 가져옴)
+        if prefix:
+            shards = [shard_of(self.bounds, prefix)]
+        else:
+            shards = range(shard_of(self.bounds, after) if after else 0, len(self.conns))
+
+        for shard in shards:
+            while True:
+                page = self._call(shard, "page", prefix, after, PAGE_SIZE)
+                yield from page
+                if len(page) < PAGE_SIZE:
+                    break
+                after = page[-1][0]
+            after = None
+
+    def get(self, word: str) -> Optional[Sequence[int]]:
+        return self._call(shard_of(self.bounds, word), "get", word)
+
+    def search_fuzzy(self, query: str, max_dist: int = 1, limit: Optional[int] = 15,
+                     time_budget: Optional[float] = 0.1) -> Tuple[List[Tuple[str, Sequence[int]]], bool]:
+        # 첫 글자가 틀렸을 수도 있으므로 모든 shard에서 찾음 (shard끼리 동시에 실행)
+        replies = self._fan_out("search_fuzzy", query, max_dist, limit, time_budget)
+        # shard마다 가까운 것부터 나오므로 편집 거리 순서는 shard 안에서만 지켜짐
+        results = list(islice(chain.from_iterable(results for results, _ in replies), limit))
+        return results, any(truncated for _, truncated in replies)
+
+    def cursor(self):
+        # node를 다른 process에 들고 있을 수 없으므로 session cursor는 사용하지 않음
+        return None
+
+    def iter_short_prefixes(self, max_len: int) -> Iterator[str]:
+        return chain.from_iterable(self._fan_out("short_prefixes", max_len))
+
+    def substring_index(self) -> "ShardedIndex":
+        return ShardedIndex(self, "infix")
+
+    def jamo_index(self) -> "ShardedIndex":
+        return ShardedIndex(self, "jamo")
+
+    def _call(self, shard: int, method: str, *args):
+        with self._locks[shard]:
+            self.conns[shard].send((method, args))
+            ok, result = self.conns[shard].recv()
+        if not ok:
+            raise result
+        return result
+
+    def _fan_out(self, method: str, *args) -> list:
+        # 모든 shard에 먼저 보내고 나서 응답을 모음 (lock은 항상 같은 순서로 잡음)
+        for lock in self._locks:
+            lock.acquire()
+        try:
+            for conn in self.conns:
+                conn.send((method, args))
+            replies = [conn.recv() for conn in self.conns]
+        finally:
+            for lock in self._locks:
+                lock.release()
+
+        for ok, result in replies:
+            if not ok:
+                raise result
+        return [result for _, result in replies]
+
+
+class ShardedIndex:
+    # shard마다 만든 SubstringIndex / JamoIndex를 하나처럼 사용
+    def __init__(self, sharded: ShardedTrie, method: str):
+        self.sharded = sharded
+        self.method = method
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[Tuple[str, Sequence[int]]]:
+        return list(islice(chain.from_iterable(self.sharded._fan_out(self.method, query, limit)), limit))
+
+    def iter_prefix(self, prefix: str) -> Iterator[Tuple[str, Sequence[int]]]:
+        return iter(self.search(prefix, PAGE_SIZE))
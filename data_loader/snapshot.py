@@ -0,0 +1,164 @@
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import Dict, Optional, Tuple, Union
+
+from .frozen_trie import FrozenTrie
+from .jamo import JamoIndex
+from .substring_index import SubstringIndex
+
+# 파일 구조 (모든 section은 8 byte 단위로 정렬)
+#   header        : magic(8) + version(u32) + section 개수(u32)
+#   section table : section마다 name(16) + typecode(1) + offset(u64) + byte 길이(u64)
+#   sections      : 배열 원본 bytes 그대로 (읽을 때는 memoryview.cast로 복사 없이 바로 사용)
+TRIE_MAGIC = b"ACTRIE\0\0"
+TRIE_VERSION = 1
+
+_HEADER = struct.Struct("<8sII")
+_ENTRY = struct.Struct("<16sc7xQQ")
+_ALIGN = 8
+
+Buffer = Union[array, bytes]
+
+# FrozenTrie의 배열들 (name -> typecode)
+_TRIE_SECTIONS = {
+    "labels": "B",
+    "label_off": "Q",
+    "first_char": "I",
+    "child_off": "I",
+    "ids_off": "Q",
+    "postings": "q",
+    "parent": "I",
+    "topk_off": "I",
+    "topk": "I",
+}
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def write_sections(path: str, magic: bytes, version: int, sections: Dict[str, Tuple[str, Buffer]]):
+    # 임시 파일에 다 쓴 뒤 rename -> 서버가 이전 snapshot을 mmap 중이어도 안전하게 교체됨
+    meta = json.dumps({"byteorder": sys.byteorder}).encode()
+    sections = {"meta": ("B", meta), **sections}
+
+    offset = _HEADER.size + _ENTRY.size * len(sections)
+    entries = []
+    for name, (typecode, data) in sections.items():
+        offset += -offset % _ALIGN
+        nbytes = len(memoryview(data).cast("B"))
+        entries.append((name, typecode, offset, nbytes, data))
+        offset += nbytes
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(magic, version, len(entries)))
+        for name, typecode, offset, nbytes, _ in entries:
+            f.write(_ENTRY.pack(name.encode(), typecode.encode(), offset, nbytes))
+        for _, _, offset, _, data in entries:
+            f.write(b"\0" * (offset - f.tell()))
+            f.write(data)
+    os.replace(tmp_path, path)
+
+
+def open_sections(path: str, magic: bytes, version: int) -> Tuple[mmap.mmap, Dict[str, memoryview]]:
+    # 파일을 mmap하고 section마다 memoryview를 돌려줌 (실제로 읽히는 page만 메모리에 올라옴)
+    with open(path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    file_magic, file_version, count = _HEADER.unpack_from(mm, 0)
+    if file_magic != magic:
+        raise SnapshotError(f"{path}: snapshot 파일이 아님")
+    if file_version != version:
+        raise SnapshotError(f"{path}: 지원하지 않는 버전 {file_version} (현재 {version})")
+
+    view = memoryview(mm)
+    sections = {}
+    for i in range(count):
+        name, typecode, offset, nbytes = _ENTRY.unpack_from(mm, _HEADER.size + _ENTRY.size * i)
+        sections[name.rstrip(b"\0").decode()] = view[offset:offset + nbytes].cast(typecode.decode())
+
+    meta = json.loads(bytes(sections.pop("meta")))
+    if meta["byteorder"] != sys.byteorder:
+        raise SnapshotError(f"{path}: byte order가 다른 환경에서 만든 snapshot ({meta['byteorder']})")
+
+    return mm, sections
+
+
+def save_trie(trie, path: str, jamo: bool = False, infix: bool = False):
+    # jamo / infix: 자모 / n-gram index도 같은 파일에 저장 (worker마다 다시 구축하지 않고 mmap으로 공유)
+    if not isinstance(trie, FrozenTrie):
+        trie = trie.freeze()
+
+    sections = _trie_sections(trie)
+    if infix:
+        index = SubstringIndex.from_trie(trie)
+        sections["infix_keys"] = ("Q", index.keys)
+        sections["infix_offsets"] = ("Q", index.offsets)
+        sections["infix_postings"] = ("I", index.postings)
+    if jamo:
+        sections.update(_trie_sections(JamoIndex.from_trie(trie).jamo_trie, "jamo_"))
+    write_sections(path, TRIE_MAGIC, TRIE_VERSION, sections)
+
+
+def load_trie(path: str) -> FrozenTrie:
+    # 역직렬화 없이 mmap된 배열을 그대로 FrozenTrie에 연결
+    mm, sections = open_sections(path, TRIE_MAGIC, TRIE_VERSION)
+    trie = _frozen_trie(sections)
+    trie.mmap = mm  # mmap이 닫히지 않도록 참조 유지
+    return trie
+
+
+def load_jamo_index(trie: FrozenTrie, path: str) -> Optional[JamoIndex]:
+    # trie는 같은 파일에서 load_trie로 읽은 것이어야 함 (node 번호로 단어를 가리킴)
+    # snapshot에 자모 index가 없으면 None
+    mm, sections = open_sections(path, TRIE_MAGIC, TRIE_VERSION)
+    if "jamo_labels" not in sections:
+        return None
+    index = JamoIndex(trie, _frozen_trie(sections, "jamo_"))
+    index.mmap = mm
+    return index
+
+
+def load_substring_index(trie: FrozenTrie, path: str) -> Optional[SubstringIndex]:
+    # load_jamo_index와 같음
+    mm, sections = open_sections(path, TRIE_MAGIC, TRIE_VERSION)
+    if "infix_keys" not in sections:
+        return None
+    index = SubstringIndex(trie, sections["infix_keys"], sections["infix_offsets"], sections["infix_postings"])
+    index.mmap = mm
+    return index
+
+
+def _trie_sections(trie: FrozenTrie, prefix: str = "") -> Dict[str, Tuple[str, Buffer]]:
+    sections = {prefix + name: (typecode, getattr(trie, name)) for name, typecode in _TRIE_SECTIONS.items()}
+    sections[prefix + "top_k_size"] = ("I", array("I", [trie.top_k_size]))
+    return sections
+
+
+def _frozen_trie(sections: Dict[str, memoryview], prefix: str = "") -> FrozenTrie:
+    arrays = {name: sections[prefix + name] for name in _TRIE_SECTIONS}
+    return FrozenTrie(**arrays, top_k_size=sections[prefix + "top_k_size"][0])
+
+
+if __name__ == '__main__':
+    # words 테이블이 바뀌었을 때 offline으로 snapshot 재생성
+    # 사용법: python -m data_loader.snapshot trie.snapshot [length|senses]
+    import time
+    from .dataset import build_trie
+
+    snapshot_path = sys.argv[1]
+    ranking = sys.argv[2] if len(sys.argv) > 2 else None
+
+    trie = build_trie(ranking)
+    start = time.time()
+    save_trie(trie, snapshot_path, jamo=os.environ.get("JAMO_INDEX") == "1", infix=os.environ.get("INFIX_INDEX") == "1")
+    print(f"save snapshot time: {time.time() - start}")
+
+    start = time.time()
+    load_trie(snapshot_path)
+    print(f"load snapshot time: {time.time() - start}")
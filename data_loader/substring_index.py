@@ -0,0 +1,91 @@
+from array import array
+from bisect import bisect_left
+from itertools import islice
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from .frozen_trie import FrozenTrie
+
+
+class SubstringIndex:
+    # 단어 중간/끝도 검색할 수 있도록 만든 n-gram(1글자 + 2글자) 역색인
+    # (ex: query=완성 -> 자동완성)
+    # query의 n-gram 중 가장 드문 것의 목록만 훑으면서 실제로 포함되는지 확인 -> limit개가 모이면 멈춤
+    # 메모리를 줄이기 위해 구축이 끝나면 n-gram별 목록을 배열 3개로 합침
+    #   keys     : n-gram을 정수로 바꾼 값 (정렬됨, 이분 탐색)
+    #   offsets  : keys[i]의 단어 번호들 = postings[offsets[i]:offsets[i + 1]]
+    #   postings : 단어 번호
+    #     trie가 FrozenTrie : 단어 끝 node 번호 (단어 / ID는 trie에서 바로 가져옴)
+    #                        -> 배열 3개만 있으면 되므로 snapshot에 같이 저장해서 mmap으로 읽을 수 있음
+    #     그 외 (CompressedTrie) : words / ids 목록의 index (구축 시점 기준, change feed와는 함께 쓰지 않음)
+    def __init__(self, trie=None, keys: Sequence[int] = None, offsets: Sequence[int] = None,
+                 postings: Sequence[int] = None, words: Optional[List[str]] = None, ids: Optional[list] = None):
+        self.trie = trie
+        self.keys = keys if keys is not None else array('Q')
+        self.offsets = offsets if offsets is not None else array('Q', [0])
+        self.postings = postings if postings is not None else array('I')
+        self.words = words  # node 번호로 가리킬 때는 None
+        self.ids = ids
+
+    @classmethod
+    def from_trie(cls, trie) -> "SubstringIndex":
+        if isinstance(trie, FrozenTrie):
+            index = cls(trie)
+            entries = ((node, word) for word, node in trie.iter_word_nodes())
+        else:
+            index = cls(trie, words=[], ids=[])
+            entries = index._append_words(trie)
+
+        grams = {}
+        for idx, word in entries:
+            for gram in set(cls._grams(word)):
+                posting = grams.get(gram)
+                if posting is None:
+                    posting = grams[gram] = array('I')
+                posting.append(idx)
+
+        for gram in sorted(grams):
+            index.keys.append(gram)
+            index.postings.extend(grams.pop(gram))
+            index.offsets.append(len(index.postings))
+        return index
+
+    def _append_words(self, trie) -> Iterator[Tuple[int, str]]:
+        for word, ids in trie.iter_prefix(""):
+            self.words.append(word)
+            self.ids.append(ids)
+            yield len(self.words) - 1, word
+
+    @staticmethod
+    def _grams(text: str) -> Iterator[int]:
+        # 1글자는 code point 그대로, 2글자는 (앞 << 21) | 뒤 (code point는 21bit 이내라 겹치지 않음)
+        for i, char in enumerate(text):
+            yield ord(char)
+            if i + 1 < len(text):
+                yield (ord(char) << 21) | ord(text[i + 1])
+
+    def _posting(self, gram: int) -> Sequence[int]:
+        i = bisect_left(self.keys, gram)
+        if i == len(self.keys) or self.keys[i] != gram:
+            return ()
+        return self.postings[self.offsets[i]:self.offsets[i + 1]]
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[Tuple[str, Sequence[int]]]:
+        return list(islice(self.iter_search(query), limit))
+
+    def iter_search(self, query: str) -> Iterator[Tuple[str, Sequence[int]]]:
+        if not query:
+            return
+
+        # 2글자 이상이면 2글자 n-gram만으로 충분히 걸러짐
+        grams = [gram for gram in set(self._grams(query)) if len(query) == 1 or gram >= 1 << 21]
+        candidates = min((self._posting(gram) for gram in grams), key=len)
+        for idx in candidates:
+            word = self._word(idx)
+            if query in word:
+                yield word, self._ids(idx)
+
+    def _word(self, idx: int) -> str:
+        return self.trie._word(idx) if self.words is None else self.words[idx]
+
+    def _ids(self, idx: int) -> Sequence[int]:
+        return self.trie._ids(idx) if self.words is None else self.ids[idx]
@@ -1,5 +1,4 @@
 from typing import List, Tuple, Set
-from data_loader.db import fetchall
 
 class TrieNode:
     def __init__(self):
@@ -55,6 +54,7 @@ class Trie:
 
 
 def a(trie):
+    from data_loader.db import fetchall
     datas = fetchall()
 
     for data in datas:
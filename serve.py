@@ -0,0 +1,35 @@
+import argparse
+import os
+
+import uvicorn
+
+from data_loader.dataset import build_trie
+from data_loader.entry_store import export_entries
+from data_loader.snapshot import save_trie
+
+# 여러 worker로 띄우는 실행 파일
+# index는 여기서 한 번만 snapshot으로 만들어두고, 각 worker는 같은 파일을 mmap해서 사용
+# -> 페이지 캐시를 공유하므로 worker 수를 늘려도 메모리는 거의 늘지 않음
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5235)
+    parser.add_argument("--snapshot", default="trie.snapshot")
+    parser.add_argument("--entries", help="상세 조회용 entry store 파일 (설정하면 상세 조회도 DB 없이 처리)")
+    parser.add_argument("--rebuild", action="store_true", help="snapshot이 있어도 DB에서 다시 구축")
+    args = parser.parse_args()
+
+    if args.rebuild or not os.path.exists(args.snapshot):
+        trie = build_trie(os.environ.get("AUTOCOMPLETE_RANKING"), quarantine_path=os.environ.get("QUARANTINE_PATH"))
+        save_trie(trie, args.snapshot, jamo=os.environ.get("JAMO_INDEX") == "1",
+                  infix=os.environ.get("INFIX_INDEX") == "1")
+
+    if args.entries and (args.rebuild or not os.path.exists(args.entries)):
+        export_entries(args.entries)
+
+    os.environ["TRIE_SNAPSHOT"] = os.path.abspath(args.snapshot)
+    if args.entries:
+        os.environ["ENTRY_STORE"] = os.path.abspath(args.entries)
+    uvicorn.run("server:app", host=args.host, port=args.port, workers=args.workers)
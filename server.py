@@ -1,18 +1,53 @@
-from fastapi import FastAPI, Query, Request
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi import FastAPI, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import HTMLResponse, JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.templating import Jinja2Templates
 
-from data_loader.db import fetchall, fetchall_by_ids, fetchall_by_word
-from data_loader.compressed_trie import CompressedTrie as Trie
+from data_loader.db import pool, fetchall_by_ids, fetchall_by_word, create_change_log, fetch_change_positions
+from data_loader.change_feed import ChangeFeed
+from data_loader.compressed_trie import CompressedTrie
+from data_loader.dataset import build_trie
+from data_loader.snapshot import load_trie, load_jamo_index, load_substring_index, save_trie
+from data_loader.entry_store import load_entries
+from data_loader.substring_index import SubstringIndex
+from data_loader.jamo import JamoIndex
+from data_loader.shard import ShardedTrie
+from data_loader.cursor import iter_short_prefixes
+from data_loader.cache import LRUCache
+from data_loader.metrics import registry, SIZE_BUCKETS
+from data_loader.executor import SearchExecutor, SearchCancelled, SearchRejected, SearchTimeout, checkpoint, remaining_budget
 
 import asyncio
+import base64
+import json
+import mysql.connector
+import os
 import time
-from tqdm import tqdm
+from contextlib import asynccontextmanager
 
 templates = Jinja2Templates(directory="template")
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await pool.open()
+    search_executor.open()
+
+    feed_task = None
+    if change_feed is not None:
+        feed_task = asyncio.create_task(change_feed.run())
+
+    yield
+
+    if feed_task is not None:
+        feed_task.cancel()
+    search_executor.close()
+    if isinstance(data_trie, ShardedTrie):
+        data_trie.close()
+    await pool.close()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -20,10 +55,82 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # 다른 origin의 client도 다음 페이지 cursor를 읽을 수 있도록 (기본으로는 일부 header만 노출됨)
+    expose_headers=["X-Next-Cursor"],
 )
 
-# Trie 준비
-data_trie = Trie()
+
+@app.exception_handler(SearchRejected)
+async def search_rejected(request: Request, exc: SearchRejected):
+    return JSONResponse({"detail": "검색 요청이 너무 많음"}, status_code=503, headers={"Retry-After": "1"})
+
+@app.exception_handler(SearchTimeout)
+async def search_timeout(request: Request, exc: SearchTimeout):
+    return JSONResponse({"detail": "검색 시간 초과"}, status_code=504)
+
+@app.exception_handler(SearchCancelled)
+async def search_cancelled(request: Request, exc: SearchCancelled):
+    # client가 이미 연결을 끊음 (보낼 곳이 없으므로 내용은 의미 없음)
+    return Response(status_code=499)
+
+AUTOCOMPLETE_LIMIT = 15
+PREFIX_MATCH_LIMIT = 20
+
+# 설정하면 node마다 순위가 매겨진 top-k 목록을 미리 계산 (length / senses)
+AUTOCOMPLETE_RANKING = os.environ.get("AUTOCOMPLETE_RANKING")
+# 설정하면 구축이 끝난 trie를 읽기 전용 flat 배열 형태로 바꿔서 메모리를 줄임
+FREEZE_INDEX = os.environ.get("FREEZE_INDEX") == "1"
+# 설정하면 DB 대신 snapshot 파일을 mmap해서 바로 사용 (없으면 DB로 구축한 뒤 저장)
+TRIE_SNAPSHOT = os.environ.get("TRIE_SNAPSHOT")
+# 설정하면 상세 조회(/search/words, /search/word)를 DB 대신 export해둔 entry store 파일(mmap)에서 읽음
+# 만들기: python -m data_loader.entry_store entries.store
+ENTRY_STORE = os.environ.get("ENTRY_STORE")
+# DB에서 구축할 때 문제가 있는 row를 기록할 파일 (JSON lines)
+QUARANTINE_PATH = os.environ.get("QUARANTINE_PATH")
+# 설정하면 (shard 수) 첫 글자 범위로 나눈 trie들을 각각 별도 process에서 병렬로 구축하고 검색
+# prefix 검색은 해당 shard 하나로만 보내고, 오타 / infix / 자모 검색은 모든 shard의 결과를 합침
+INDEX_SHARDS = int(os.environ.get("INDEX_SHARDS", 0))
+# 설정하면 (초 단위) words 테이블의 변경분을 주기적으로 trie에 반영 (읽기 전용 index, INFIX_INDEX / JAMO_INDEX와는 사용 불가)
+CHANGE_FEED_INTERVAL = os.environ.get("CHANGE_FEED_INTERVAL")
+# 설정하면 단어 중간/끝 검색용 n-gram index도 구축 (/autocomplete?mode=infix)
+INFIX_INDEX = os.environ.get("INFIX_INDEX") == "1"
+# 설정하면 자모 단위 index도 구축해서 입력 중인 글자(자동와 -> 자동완성)로도 찾을 수 있게 함
+JAMO_INDEX = os.environ.get("JAMO_INDEX") == "1"
+# prefix 결과가 없을 때 오타 허용 검색으로 다시 찾음 (0이면 사용 안 함)
+FUZZY_MAX_DIST = int(os.environ.get("FUZZY_MAX_DIST", 1))
+FUZZY_TIME_BUDGET = float(os.environ.get("FUZZY_TIME_BUDGET", 0.1))
+
+# session별 검색 cursor (이전 입력에서 이어서 탐색)
+session_cursors = LRUCache(int(os.environ.get("SESSION_CURSOR_SIZE", 10000)))
+
+# (index 버전, prefix, limit) -> (직렬화된 응답, 다음 페이지 cursor)
+# 버전이 key에 있으므로 index가 바뀌기 전에 시작한 검색의 결과가 바뀐 뒤에 쓰이는 일은 없음
+response_cache = LRUCache(int(os.environ.get("RESPONSE_CACHE_SIZE", 20000)))
+# 시작할 때 이 길이 이하의 모든 prefix를 미리 계산해둠 (대부분의 요청은 1~2글자)
+PREWARM_PREFIX_LEN = int(os.environ.get("PREWARM_PREFIX_LEN", 1))
+AUTOCOMPLETE_MAX_AGE = int(os.environ.get("AUTOCOMPLETE_MAX_AGE", 0))
+
+# trie 검색은 event loop 대신 thread pool에서 실행 (무거운 검색이 다른 요청을 막지 않도록)
+# SEARCH_MAX_PENDING개보다 많이 쌓이면 503, SEARCH_TIME_BUDGET초를 넘기면 504
+search_executor = SearchExecutor(
+    int(os.environ.get("SEARCH_WORKERS", 4)),
+    int(os.environ.get("SEARCH_MAX_PENDING", 64)),
+    float(os.environ.get("SEARCH_TIME_BUDGET", 0.5)),
+)
+
+# 단계별 처리 시간 / 결과 크기 (/metrics)
+REQUEST_SECONDS = registry.histogram("autocomplete_request_seconds", "/autocomplete 요청 전체 처리 시간")
+DESCENT_SECONDS = registry.histogram("autocomplete_descent_seconds", "prefix가 끝나는 node까지 내려가는 시간")
+COLLECT_SECONDS = registry.histogram("autocomplete_collect_seconds", "prefix 아래에서 결과를 모으는 시간")
+JAMO_SECONDS = registry.histogram("autocomplete_jamo_seconds", "자모 단위 결과로 채우는 시간")
+FUZZY_SECONDS = registry.histogram("autocomplete_fuzzy_seconds", "오타 허용 검색 시간")
+SERIALIZE_SECONDS = registry.histogram("autocomplete_serialize_seconds", "결과 JSON 직렬화 시간")
+RESULT_SIZE = registry.histogram("autocomplete_result_size", "새로 계산한 응답의 결과 개수", SIZE_BUCKETS)
+NODES_VISITED = registry.histogram("autocomplete_nodes_visited", "새로 계산한 응답 하나에서 거친 trie node 수", SIZE_BUCKETS)
+NOT_MODIFIED = registry.counter("autocomplete_not_modified_total", "ETag가 같아서 304로 응답한 수")
+registry.gauge("response_cache_hits", "응답 캐시 hit 수", lambda: response_cache.hits)
+registry.gauge("response_cache_misses", "응답 캐시 miss 수", lambda: response_cache.misses)
+registry.gauge("trie_node_count", "index의 node 수", lambda: data_trie.node_cnt)
 
 
 @app.get("/", response_class=HTMLResponse)
@@ -32,62 +139,419 @@ async def root(request: Request):
 
 
 @app.get("/autocomplete")
-async def autocomplete(q: str = Query(..., min_length=1)):
-    start = time.time()
-    results = data_trie.search_prefix(q)
-    done_time = time.time() - start
-    print(f"search_time: {done_time}")
+async def autocomplete(request: Request, q: str = Query(..., min_length=1),
+                       mode: str = Query("prefix", pattern="^(prefix|infix)$"),
+                       session: str = None, cursor: str = None):
+    start = time.perf_counter()
+    # 같은 index 버전이면 같은 요청에 대한 결과도 같음 -> 브라우저가 들고 있는 결과를 그대로 쓰게 함
+    etag = f'W/"{index_version()}"'
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={AUTOCOMPLETE_MAX_AGE}"}
+    if request.headers.get("if-none-match") == etag:
+        NOT_MODIFIED.inc()
+        return Response(status_code=304, headers=headers)
+
+    next_cursor = None
+    if cursor is not None:
+        # 다음 페이지: 토큰에 담긴 위치부터 이어서 순회 (앞 페이지들을 다시 만들지 않음)
+        state = decode_cursor(cursor)
+        if state.get("q") != q:
+            raise HTTPException(status_code=400, detail="다른 검색어의 cursor")
+        body, next_cursor = await search_executor.run(next_page, q, state, is_cancelled=request.is_disconnected)
+    elif mode == "infix":
+        if substring_index is None:
+            raise HTTPException(status_code=400, detail="infix index가 구축되지 않음 (INFIX_INDEX=1)")
+        body = await search_executor.run(search_infix, q, is_cancelled=request.is_disconnected)
+    else:
+        body, next_cursor, complete = await cached_autocomplete(q, session, request.is_disconnected)
+        if not complete:
+            # 오타 검색이 time budget에 걸려 잘린 결과 -> 브라우저도 들고 있지 않도록
+            headers = {"Cache-Control": "no-store"}
+    REQUEST_SECONDS.observe(time.perf_counter() - start)
+
+    if next_cursor is not None:
+        headers["X-Next-Cursor"] = next_cursor
+    return Response(body, media_type="application/json", headers=headers)
+
+@app.websocket("/ws/autocomplete")
+async def autocomplete_ws(websocket: WebSocket):
+    # 연결 하나로 keystroke마다 {"seq": n, "q": "..."}를 받고 {"seq": n, "results": [...]}로 응답
+    # 처리하는 동안 더 새로운 입력이 들어오면 이전 입력은 버리고 가장 마지막 seq에 대해서만 응답
+    await websocket.accept()
+    session = f"ws-{id(websocket)}"
+    latest = {"seq": -1, "q": ""}
+    pending = asyncio.Event()
+
+    async def receive():
+        while True:
+            try:
+                seq, q = parse_ws_message(await websocket.receive_text())
+            except KeyError:
+                # binary frame
+                raise ValueError("text frame이 아님")
+            if seq > latest["seq"]:
+                latest.update(seq=seq, q=q)
+                pending.set()
+
+    receiver = asyncio.create_task(receive())
+    try:
+        while True:
+            waiter = asyncio.create_task(pending.wait())
+            await asyncio.wait({receiver, waiter}, return_when=asyncio.FIRST_COMPLETED)
+            if receiver.done():
+                waiter.cancel()
+                exc = receiver.exception()
+                if isinstance(exc, ValueError):
+                    # 형식이 잘못된 메시지 -> 1003 (unsupported data)로 닫음
+                    await websocket.close(code=1003, reason=str(exc))
+                elif exc is not None and not isinstance(exc, WebSocketDisconnect):
+                    await websocket.close(code=1011)
+                    raise exc
+                break
+
+            pending.clear()
+            seq, q = latest["seq"], latest["q"]
+
+            async def superseded():
+                return seq != latest["seq"]
+
+            try:
+                body, next_cursor, _ = await cached_autocomplete(q, session, superseded) if q else (b"[]", None, True)
+            except SearchCancelled:
+                continue
+            except (SearchRejected, SearchTimeout):
+                # 빈 결과 -> 화면에는 이전 결과가 그대로 남음
+                body, next_cursor = b"[]", None
+            # 검색하는 사이에 새 입력이 왔으면 이 결과는 보내지 않음
+            if seq != latest["seq"]:
+                continue
+            await websocket.send_text(
+                f'{{"seq":{seq},"next_cursor":{json.dumps(next_cursor)},"results":{body.decode()}}}'
+            )
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receiver.cancel()
+        session_cursors.invalidate([session])
+
+def parse_ws_message(text: str):
+    # {"seq": 정수, "q": 문자열} 형식만 받음, 아니면 ValueError
+    message = json.loads(text)
+    if not isinstance(message, dict):
+        raise ValueError("메시지가 JSON object가 아님")
+    seq, q = message.get("seq", 0), message.get("q", "")
+    if not isinstance(seq, int) or isinstance(seq, bool):
+        raise ValueError("seq가 정수가 아님")
+    if not isinstance(q, str):
+        raise ValueError("q가 문자열이 아님")
+    return seq, q
+
+async def cached_autocomplete(q: str, session: str = None, is_cancelled=None):
+    # 첫 페이지는 직렬화까지 끝난 bytes를 캐시해둠
+    # 반환: (직렬화된 응답, 다음 페이지 cursor, 잘리지 않은 결과인지)
+    key = (index_version(), q, AUTOCOMPLETE_LIMIT)
+    cached = response_cache.get(key)
+    if cached is not None:
+        return (*cached, True)
+
+    # 캐시 / session cursor는 event loop에서만 건드리고, 검색만 thread에서 실행
+    # cursor는 쓰는 동안 꺼내둠 (같은 session의 요청이 동시에 오면 나중 요청은 새 cursor로 시작)
+    cursor = session_cursors.pop(session) if session is not None else None
+    if session is not None and (cursor is None or cursor.trie is not data_trie):
+        cursor = data_trie.cursor()
+    body, next_cursor, complete = await search_executor.run(search_autocomplete, q, cursor, is_cancelled=is_cancelled)
+    if cursor is not None:
+        session_cursors.put(session, cursor)
+    # time budget 때문에 잘린 결과는 다음에 다시 검색
+    if complete:
+        response_cache.put(key, (body, next_cursor))
+    return body, next_cursor, complete
+
+def search_autocomplete(q: str, cursor=None):
+    next_cursor = None
+    truncated = False
+    # 동시에 실행 중인 다른 검색의 방문 수가 섞일 수 있음 (대략적인 값)
+    visited = data_trie.nodes_visited
+    results = search_with_cursor(q, cursor)
+    if len(results) == AUTOCOMPLETE_LIMIT:
+        # top-k 순위로 보여준 첫 페이지는 다음 페이지들에서 빼고 처음부터 순회
+        ranked = AUTOCOMPLETE_LIMIT <= data_trie.top_k_size
+        next_cursor = encode_cursor({"q": q, "after": None if ranked else results[-1][0], "ranked": ranked})
+    if len(results) < AUTOCOMPLETE_LIMIT and jamo_index is not None:
+        # 글자 단위로 일치하는 결과를 먼저 보여주고, 남는 자리는 자모 단위 결과로 채움
+        seen = {word for word, _ in results}
+        with JAMO_SECONDS.time():
+            for word, ids in jamo_index.iter_prefix(q):
+                checkpoint()
+                if word not in seen:
+                    results.append((word, ids))
+                    if len(results) == AUTOCOMPLETE_LIMIT:
+                        break
+    if not results and FUZZY_MAX_DIST:
+        # query가 FUZZY_MAX_DIST 글자 이하이면 빈 결과 (모든 단어가 후보가 되므로)
+        with FUZZY_SECONDS.time():
+            results, truncated = data_trie.search_fuzzy(q, FUZZY_MAX_DIST, AUTOCOMPLETE_LIMIT, remaining_budget(FUZZY_TIME_BUDGET))
+
+    NODES_VISITED.observe(data_trie.nodes_visited - visited)
+    return render_results(results), next_cursor, not truncated
+
+def render_results(results) -> bytes:
+    # JSONResponse와 같은 형식
+    RESULT_SIZE.observe(len(results))
+    with SERIALIZE_SECONDS.time():
+        return json.dumps(
+            [{"word": word, "ids": list(ids)} for word, ids in results],
+            ensure_ascii=False, separators=(",", ":"),
+        ).encode()
+
+def encode_cursor(state: dict) -> str:
+    return base64.urlsafe_b64encode(json.dumps(state, ensure_ascii=False).encode()).decode()
+
+def decode_cursor(token: str) -> dict:
+    # {"q": str, "after": str | None, "ranked": bool} 형식이 아니면 400
+    try:
+        state = json.loads(base64.urlsafe_b64decode(token.encode()))
+    except ValueError:
+        state = None
+    if not (isinstance(state, dict) and isinstance(state.get("q"), str)
+            and isinstance(state.get("after"), (str, type(None)))
+            and isinstance(state.get("ranked", False), bool)):
+        raise HTTPException(status_code=400, detail="잘못된 cursor")
+    return state
 
-    return JSONResponse([
-        {"word": word, "ids": list(ids)} for word, ids in results[:15]
-    ])
+def next_page(q: str, state: dict):
+    # cursor = 마지막으로 보여준 단어, 그 단어의 경로만 다시 내려가서 바로 다음 단어부터 이어감
+    shown = set()
+    if state.get("ranked"):
+        shown = {word for word, _ in data_trie.search_prefix(q, limit=AUTOCOMPLETE_LIMIT)}
 
-async def get_prefix_matches(query):
+    results = []
+    for word, ids in data_trie.iter_prefix(q, after=state.get("after")):
+        checkpoint()
+        if word in shown:
+            continue
+        if len(results) == AUTOCOMPLETE_LIMIT:
+            return render_results(results), encode_cursor({**state, "after": results[-1][0]})
+        results.append((word, ids))
+    return render_results(results), None
+
+def search_infix(q: str) -> bytes:
+    return render_results(substring_index.search(q, limit=AUTOCOMPLETE_LIMIT))
+
+def search_with_cursor(q: str, cursor):
+    if isinstance(data_trie, ShardedTrie):
+        # descent / 수집 모두 shard process 안에서 일어남
+        with COLLECT_SECONDS.time():
+            return data_trie.search_prefix(q, limit=AUTOCOMPLETE_LIMIT)
+    if cursor is None:
+        # search_prefix와 같음, descent / 수집 시간을 따로 재기 위해 나눠서 호출
+        with DESCENT_SECONDS.time():
+            found = data_trie._find_node(q)
+        if found is None:
+            return []
+        with COLLECT_SECONDS.time():
+            return data_trie._search_node(*found, AUTOCOMPLETE_LIMIT)
+
+    # 같은 session의 이전 입력에 이어서 바뀐 글자만큼만 탐색
+    with DESCENT_SECONDS.time():
+        cursor.seek(q)
+    with COLLECT_SECONDS.time():
+        return cursor.results(AUTOCOMPLETE_LIMIT)
+
+async def get_prefix_matches(query, is_cancelled=None):
+    match_ids = await search_executor.run(collect_prefix_ids, query, is_cancelled=is_cancelled)
+    return await fetch_entries_by_ids(match_ids)
+
+async def fetch_entries_by_ids(ids: list):
+    if entry_store is not None:
+        return entry_store.fetch_by_ids(ids)
+    return await fetchall_by_ids(ids)
+
+async def fetch_entries_by_word(word: str):
+    if entry_store is not None:
+        return entry_store.fetch_by_word(word)
+    return await fetchall_by_word(word)
+
+def collect_prefix_ids(query):
     # trie엔 결과가 많이 담겨있음,
     # 단어는 적게, id는 많이 가져가는 것으로 결졍 (사유: 사전이니까 동음이의어는 다 보여줘야 함)
     # 단, 최대 개수는 20개로 한정
     match_ids = []
 
-    nodes = data_trie.search_prefix(query)
-    for word, ids in nodes: # 한 단어에 대해
+    # 20개가 모이면 바로 멈추도록 lazy하게 순회
+    for word, ids in data_trie.iter_prefix(query): # 한 단어에 대해
+        checkpoint()
         if word == query: # 이미 조회 당한 친구
             continue
 
-        match_ids.extend(list(ids))
-        if len(match_ids) > 20:
+        match_ids.extend(ids)
+        if len(match_ids) > PREFIX_MATCH_LIMIT:
             break
 
-    return await fetchall_by_ids(match_ids)
+    return match_ids
+
+@app.get("/metrics")
+async def metrics():
+    # Prometheus text 형식 (worker process별 값)
+    return Response(registry.render(), media_type="text/plain; version=0.0.4")
 
 @app.get("/search/words")
-async def search_by_ids(word: str, ids: str):
+async def search_by_ids(request: Request, word: str, ids: str):
     exact, prefix = await asyncio.gather(
-        fetchall_by_ids(ids.split(',')),
-        get_prefix_matches(word)
+        fetch_entries_by_ids(ids.split(',')),
+        get_prefix_matches(word, request.is_disconnected)
     )
     return exact + prefix
 
 @app.get("/search/word")
 async def search_by_word(q: str):
-    return fetchall_by_word(q)
+    return await fetch_entries_by_word(q)
 
-def generate_dataset():
+def index_version() -> str:
+    return f"{index_build_id}.{data_trie.version}"
+
+
+def prewarm_prefixes() -> list:
+    if isinstance(data_trie, ShardedTrie):
+        return list(data_trie.iter_short_prefixes(PREWARM_PREFIX_LEN))
+    return list(iter_short_prefixes(data_trie, PREWARM_PREFIX_LEN))
+
+
+def prewarm_response_cache():
+    # 시작할 때 (아직 요청을 받기 전이므로 바로 실행)
     start = time.time()
-    datas = fetchall()
-    print(f"fetch time: {time.time() - start}")
-    # random.shuffle(datas)
+    version = index_version()
+    for prefix in prewarm_prefixes():
+        body, next_cursor, complete = search_autocomplete(prefix)
+        if complete:
+            response_cache.put((version, prefix, AUTOCOMPLETE_LIMIT), (body, next_cursor))
+    print(f"prewarm response cache time: {time.time() - start} ({len(response_cache)} prefixes)")
+
+
+async def rewarm_response_cache():
+    # change feed가 변경을 반영한 뒤 호출
+    # 이전 버전의 항목은 key가 달라서 더 이상 쓰이지 않으므로 비우기만 하고,
+    # 다시 채우는 검색은 search_executor에서 하나씩 실행 (event loop를 막지 않고, trie 변경과 겹치지 않도록)
     start = time.time()
-    for idx in tqdm(range(len(datas))):
-        data = datas[idx]
+    response_cache.clear()
+    try:
+        prefixes = await search_executor.run(prewarm_prefixes)
+    except (SearchRejected, SearchTimeout):
+        return
+
+    version = index_version()
+    for prefix in prefixes:
+        if version != index_version():
+            # 그 사이에 또 바뀜 -> 다음 호출에서 다시 채움
+            return
         try:
-            cur_word = data[1].replace('-', '')
-            cur_word = cur_word.replace('^', ' ')
-            data_trie.insert(cur_word, data[0])
-        except:
-            print(idx, data)
-            exit(0)
-    print(f"generate trie time: {time.time() - start}")
-    print(f"trie node cnt: {data_trie.node_cnt}")
+            body, next_cursor, complete = await search_executor.run(search_autocomplete, prefix)
+        except (SearchRejected, SearchTimeout, SearchCancelled):
+            # 바쁠 때는 건너뜀 (요청이 오면 그때 검색해서 캐시됨)
+            continue
+        if complete:
+            response_cache.put((version, prefix, AUTOCOMPLETE_LIMIT), (body, next_cursor))
+    print(f"rewarm response cache time: {time.time() - start} ({len(response_cache)} prefixes)")
 
 
-generate_dataset()
+def build_index():
+    if INDEX_SHARDS:
+        if TRIE_SNAPSHOT or FREEZE_INDEX:
+            raise RuntimeError("INDEX_SHARDS는 FREEZE_INDEX / TRIE_SNAPSHOT과 함께 사용할 수 없음")
+        start = time.time()
+        trie = ShardedTrie.start(INDEX_SHARDS, AUTOCOMPLETE_RANKING, AUTOCOMPLETE_LIMIT, INFIX_INDEX, JAMO_INDEX)
+        print(f"build {len(trie.conns)} shards time: {time.time() - start}")
+        print(f"trie node cnt: {trie.node_cnt}")
+        return trie
+
+    if TRIE_SNAPSHOT and os.path.exists(TRIE_SNAPSHOT):
+        start = time.time()
+        trie = load_trie(TRIE_SNAPSHOT)
+        print(f"load snapshot time: {time.time() - start}")
+        print(f"trie node cnt: {trie.node_cnt}")
+        return trie
+
+    trie = build_trie(AUTOCOMPLETE_RANKING, AUTOCOMPLETE_LIMIT, quarantine_path=QUARANTINE_PATH)
+
+    if TRIE_SNAPSHOT:
+        start = time.time()
+        save_trie(trie, TRIE_SNAPSHOT, jamo=JAMO_INDEX, infix=INFIX_INDEX)
+        print(f"save snapshot time: {time.time() - start}")
+        return load_trie(TRIE_SNAPSHOT)
+
+    if FREEZE_INDEX:
+        start = time.time()
+        trie = trie.freeze()
+        print(f"freeze time: {time.time() - start}")
+
+    return trie
+
+
+# Trie 준비
+change_feed = None
+if CHANGE_FEED_INTERVAL:
+    # 수정/삭제 기록용 word_changes 테이블 + trigger가 없으면 만듦 (words 테이블의 TRIGGER 권한 필요)
+    try:
+        create_change_log()
+    except mysql.connector.Error as e:
+        raise RuntimeError(f"CHANGE_FEED_INTERVAL: word_changes 테이블 / trigger를 만들 수 없음 "
+                           f"(권한이 있는 계정으로 data_loader.db.create_change_log()를 먼저 실행): {e}") from e
+    # 구축 전에 위치를 잡아둠 (구축 중에 들어온 변경분이 빠지지 않도록, 중복 반영은 문제 없음)
+    last_id, last_seq = fetch_change_positions()
+
+data_trie = build_index()
+# ETag에 쓰이는 index 식별자 (같은 snapshot을 쓰는 worker끼리는 같은 값)
+index_build_id = int(os.path.getmtime(TRIE_SNAPSHOT) if TRIE_SNAPSHOT else time.time())
+
+if CHANGE_FEED_INTERVAL:
+    if not isinstance(data_trie, CompressedTrie):
+        raise RuntimeError("CHANGE_FEED_INTERVAL은 FREEZE_INDEX / TRIE_SNAPSHOT / INDEX_SHARDS와 함께 사용할 수 없음")
+    if ENTRY_STORE:
+        raise RuntimeError("CHANGE_FEED_INTERVAL은 ENTRY_STORE와 함께 사용할 수 없음 (entry store는 export 시점 기준)")
+    if INFIX_INDEX or JAMO_INDEX:
+        # 두 index 모두 구축 시점의 단어 목록 / ids 배열을 그대로 들고 있으므로 feed로 바뀐 단어가 반영되지 않음
+        # (지운 단어가 빈 ids로 계속 나오고 새 단어는 나오지 않음)
+        raise RuntimeError("CHANGE_FEED_INTERVAL은 INFIX_INDEX / JAMO_INDEX와 함께 사용할 수 없음 (index는 구축 시점 기준)")
+    change_feed = ChangeFeed(data_trie, last_id, last_seq, float(CHANGE_FEED_INTERVAL), executor=search_executor)
+
+entry_store = None
+if ENTRY_STORE:
+    start = time.time()
+    entry_store = load_entries(ENTRY_STORE)
+    print(f"load entries time: {time.time() - start} ({len(entry_store)} rows)")
+
+substring_index = None
+if INFIX_INDEX and isinstance(data_trie, ShardedTrie):
+    # shard마다 이미 구축됨
+    substring_index = data_trie.substring_index()
+elif INFIX_INDEX:
+    start = time.time()
+    if TRIE_SNAPSHOT:
+        # snapshot에 같이 저장해둔 것을 mmap (worker끼리 메모리 공유)
+        substring_index = load_substring_index(data_trie, TRIE_SNAPSHOT)
+    if substring_index is not None:
+        print(f"load infix index time: {time.time() - start}")
+    else:
+        if TRIE_SNAPSHOT:
+            print("snapshot에 infix index가 없음 -> process마다 구축 (INFIX_INDEX=1로 snapshot을 다시 만들면 공유됨)")
+        substring_index = SubstringIndex.from_trie(data_trie)
+        print(f"build infix index time: {time.time() - start}")
+
+jamo_index = None
+if JAMO_INDEX and isinstance(data_trie, ShardedTrie):
+    jamo_index = data_trie.jamo_index()
+elif JAMO_INDEX:
+    start = time.time()
+    if TRIE_SNAPSHOT:
+        # snapshot에 같이 저장해둔 것을 mmap (worker끼리 메모리 공유)
+        jamo_index = load_jamo_index(data_trie, TRIE_SNAPSHOT)
+    if jamo_index is not None:
+        print(f"load jamo index time: {time.time() - start}")
+    else:
+        if TRIE_SNAPSHOT:
+            print("snapshot에 jamo index가 없음 -> process마다 구축 (JAMO_INDEX=1로 snapshot을 다시 만들면 공유됨)")
+        jamo_index = JamoIndex.from_trie(data_trie)
+        print(f"build jamo index time: {time.time() - start}")
+
+prewarm_response_cache()
+if change_feed is not None:
+    change_feed.on_change.append(rewarm_response_cache)
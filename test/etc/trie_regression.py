@@ -0,0 +1,172 @@
+import os
+import random
+import tempfile
+
+from data_loader.compressed_trie import CompressedTrie
+from data_loader.change_feed import ChangeFeed
+from data_loader.jamo import JamoIndex
+from data_loader.snapshot import save_trie, load_trie, load_jamo_index, load_substring_index
+from data_loader.substring_index import SubstringIndex
+
+# trie 변경(insert / delete / _merge), from_sorted, snapshot 저장/읽기가 서로 같은 결과를 내는지 확인하는 script
+# DB 없이 무작위 단어로 돌림 (글자 종류를 적게 해서 edge 분할 / 합치기가 자주 일어나도록)
+# 사용법: PYTHONPATH=. python test/etc/trie_regression.py [반복 횟수]
+
+CHARS = "가나다라 -"
+
+
+def random_words(rng: random.Random, n: int):
+    return [("".join(rng.choice(CHARS) for _ in range(rng.randint(1, 6))), db_id) for db_id in range(1, n + 1)]
+
+
+def dump(trie, prefix: str = ""):
+    # 순회 순서는 trie 종류마다 다르므로 (단어, 정렬된 id) 목록으로 비교
+    return sorted((word, sorted(ids)) for word, ids in trie.iter_prefix(prefix))
+
+
+def expected(model: dict, prefix: str = ""):
+    return sorted((word, sorted(ids)) for word, ids in model.items() if ids and word.startswith(prefix))
+
+
+def check_structure(trie: CompressedTrie):
+    # 압축이 유지되는지: root 외에 단어 끝도 아니면서 자식이 하나뿐인 node가 없어야 함 (delete 후 _merge)
+    count = 0
+    stack = [trie.root]
+    while stack:
+        node = stack.pop()
+        count += 1
+        if node is not trie.root:
+            assert node.edge, "빈 edge"
+            assert node.is_end_of_word or len(node.children) >= 2, f"합쳐지지 않은 node: {node.edge!r}"
+            assert node.is_end_of_word == bool(node.ids), f"is_end_of_word와 ids가 다름: {node.edge!r}"
+        for char, child in node.children.items():
+            assert child.edge[0] == char, f"children key와 edge 첫 글자가 다름: {char!r} {child.edge!r}"
+            stack.append(child)
+    assert count == trie.node_cnt, f"node_cnt {trie.node_cnt} != 실제 {count}"
+
+
+def check_insert_delete(rng: random.Random):
+    words = random_words(rng, 300)
+    trie = CompressedTrie()
+    model = {}
+    rng.shuffle(words)
+    for word, db_id in words:
+        trie.insert(word, db_id)
+        model.setdefault(word, set()).add(db_id)
+    check_structure(trie)
+    assert dump(trie) == expected(model)
+
+    # 절반을 무작위로 지우면서 매번 구조 확인
+    rng.shuffle(words)
+    for word, db_id in words[:len(words) // 2]:
+        assert trie.delete(word, db_id)
+        model[word].discard(db_id)
+        check_structure(trie)
+    assert not trie.delete(words[0][0], words[0][1]), "이미 지운 id를 다시 지움"
+    assert dump(trie) == expected(model)
+    for prefix in ("가", "나다", " ", "라-"):
+        assert dump(trie, prefix) == expected(model, prefix), prefix
+
+    # 지운 뒤 다시 넣어도 같은 상태
+    for word, db_id in words[:len(words) // 2]:
+        trie.insert(word, db_id)
+        model[word].add(db_id)
+    check_structure(trie)
+    assert dump(trie) == expected(model)
+    return trie, model
+
+
+def check_from_sorted(rng: random.Random):
+    words = random_words(rng, 300)
+    inserted = CompressedTrie()
+    for word, db_id in words:
+        inserted.insert(word, db_id)
+    built = CompressedTrie.from_sorted(sorted(words))
+    check_structure(built)
+    assert built.node_cnt == inserted.node_cnt
+    assert dump(built) == dump(inserted)
+
+    try:
+        CompressedTrie.from_sorted([("나", 1), ("가", 2)])
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("정렬되지 않은 입력을 받아들임")
+
+
+def check_top_k(trie: CompressedTrie, model: dict, rng: random.Random):
+    # insert / delete 중에 갱신한 top_k가 처음부터 다시 계산한 것과 같아야 함
+    trie.build_top_k(5)
+    for _ in range(50):
+        word = "".join(rng.choice(CHARS) for _ in range(rng.randint(1, 6)))
+        db_id = rng.randint(1, 300)
+        if db_id in model.get(word, ()):
+            trie.delete(word, db_id)
+            model[word].discard(db_id)
+        else:
+            trie.insert(word, db_id)
+            model.setdefault(word, set()).add(db_id)
+
+    fresh = CompressedTrie.from_sorted(sorted((word, db_id) for word, ids in model.items() for db_id in ids))
+    fresh.build_top_k(5)
+    for prefix in ("", "가", "나", "다라", " "):
+        assert trie.search_prefix(prefix, 5) == fresh.search_prefix(prefix, 5), prefix
+
+
+def check_snapshot(trie: CompressedTrie, rng: random.Random):
+    # snapshot에서 mmap으로 읽은 trie / 자모 / n-gram index가 메모리에서 만든 것과 같아야 함
+    frozen = trie.freeze()
+    jamo = JamoIndex.from_trie(trie)
+    infix = SubstringIndex.from_trie(trie)
+
+    fd, path = tempfile.mkstemp(suffix=".snapshot")
+    os.close(fd)
+    try:
+        save_trie(trie, path, jamo=True, infix=True)
+        loaded = load_trie(path)
+        loaded_jamo = load_jamo_index(loaded, path)
+        loaded_infix = load_substring_index(loaded, path)
+
+        assert loaded.node_cnt == frozen.node_cnt == trie.node_cnt
+        assert dump(loaded) == dump(frozen) == dump(trie)
+        for _ in range(30):
+            query = "".join(rng.choice(CHARS) for _ in range(rng.randint(1, 3)))
+            assert loaded.search_prefix(query, 5) == frozen.search_prefix(query, 5), query
+            assert dump(loaded, query) == dump(trie, query), query
+            assert sorted(loaded_infix.search(query)) == sorted(infix.search(query)), query
+            assert sorted(w for w, _ in loaded_jamo.search_prefix(query)) == \
+                sorted(w for w, _ in jamo.search_prefix(query)), query
+            assert loaded.get(query) == frozen.get(query), query
+    finally:
+        # mmap은 배열이 참조하고 있으므로 닫지 않음 (파일만 지움)
+        os.remove(path)
+
+
+def check_change_feed():
+    # 정규화하면 빈 단어가 되는 row는 root에 들어가지 않고 격리되어야 함
+    trie = CompressedTrie()
+    feed = ChangeFeed(trie, last_id=0, last_seq=0, interval=1)
+    feed._apply([(1, "가-나"), (2, "-"), (3, None)], [])
+    assert feed.last_id == 3
+    assert not trie.root.is_end_of_word
+    assert dump(trie) == [("가나", [1])]
+
+    # 수정: 예전 단어에서 지우고 새 단어에 넣음 (새 단어가 빈 단어면 지우기만)
+    feed._apply([], [(1, 1, "가-나", "가다"), (2, 1, "가다", "--")])
+    assert feed.last_seq == 2
+    assert not trie.root.is_end_of_word
+    assert dump(trie) == []
+
+
+if __name__ == '__main__':
+    import sys
+
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    for seed in range(rounds):
+        rng = random.Random(seed)
+        trie, model = check_insert_delete(rng)
+        check_from_sorted(rng)
+        check_snapshot(trie, rng)
+        check_top_k(trie, model, rng)
+    check_change_feed()
+    print(f"ok ({rounds} rounds)")